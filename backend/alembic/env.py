@@ -1,4 +1,6 @@
+import sys
 from logging.config import fileConfig
+from pathlib import Path
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
@@ -14,11 +16,29 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# アプリケーションのモジュール（core, models など）を読み込めるようにする
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from core.config import settings  # noqa: E402
+from core.database import Base  # noqa: E402
+from models import transaction  # noqa: E402, F401
+
+# 接続先が明示されていなければアプリと同じ DATABASE_URL を使う
+if not config.get_main_option("sqlalchemy.url"):
+    config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
-# from myapp import mymodel
-# target_metadata = mymodel.Base.metadata
-target_metadata = None
+target_metadata = Base.metadata
+
+
+# 全文検索インデックス（0005 で作成。SQLite の FTS5 は transaction_search_* の内部テーブルも作る）は
+# モデルに含まれないため、autogenerate・check で削除の対象にしない
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table" and reflected and compare_to is None:
+        return not name.startswith("transaction_search")
+    return True
+
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -42,6 +62,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -65,7 +86,10 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            render_as_batch=connection.dialect.name == "sqlite",
         )
 
         with context.begin_transaction():
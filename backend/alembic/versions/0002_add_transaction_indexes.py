@@ -0,0 +1,39 @@
+"""add transaction indexes and unique category name
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_categories_name", "categories", ["name"], unique=True)
+    op.create_index("ix_transactions_date", "transactions", ["date"], unique=False)
+    op.create_index(
+        "ix_transactions_type_date", "transactions", ["type", "date"], unique=False
+    )
+    op.create_index(
+        "ix_transactions_category_id_date",
+        "transactions",
+        ["category_id", "date"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_category_id_date", table_name="transactions")
+    op.drop_index("ix_transactions_type_date", table_name="transactions")
+    op.drop_index("ix_transactions_date", table_name="transactions")
+    op.drop_index("ix_categories_name", table_name="categories")
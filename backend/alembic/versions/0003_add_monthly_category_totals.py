@@ -0,0 +1,54 @@
+"""add monthly category totals
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "monthly_category_totals",
+        sa.Column("month", sa.String(length=7), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=False),
+        sa.Column("income", sa.Numeric(), nullable=False),
+        sa.Column("expense", sa.Numeric(), nullable=False),
+        sa.Column("transaction_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["category_id"], ["categories.id"]),
+        sa.PrimaryKeyConstraint("month", "category_id"),
+    )
+
+    # 既存の取引から集計する
+    if op.get_bind().dialect.name == "postgresql":
+        month = "to_char(date, 'YYYY-MM')"
+    else:
+        month = "strftime('%Y-%m', date)"
+    op.execute(
+        f"""
+        INSERT INTO monthly_category_totals
+            (month, category_id, income, expense, transaction_count)
+        SELECT {month}, category_id,
+            SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END),
+            SUM(CASE WHEN type = 'income' THEN 0 ELSE amount END),
+            COUNT(*)
+        FROM transactions
+        GROUP BY {month}, category_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("monthly_category_totals")
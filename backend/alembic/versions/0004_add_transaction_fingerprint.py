@@ -0,0 +1,34 @@
+"""add transaction fingerprint
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 既存の行は NULL のまま（NULL 同士は一意制約に違反しない）
+    with op.batch_alter_table("transactions") as batch_op:
+        batch_op.add_column(sa.Column("fingerprint", sa.String(64), nullable=True))
+    op.create_index(
+        "ix_transactions_fingerprint", "transactions", ["fingerprint"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_fingerprint", table_name="transactions")
+    with op.batch_alter_table("transactions") as batch_op:
+        batch_op.drop_column("fingerprint")
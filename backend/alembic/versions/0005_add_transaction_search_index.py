@@ -0,0 +1,88 @@
+"""add transaction search index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 既存の取引を登録するときに一度に読み込む行数
+FILL_CHUNK_SIZE = 50_000
+
+
+# 作成時点の内容の正規化（半角ハイフンを長音に、NFKC、casefold）
+# アプリ側（services/search_index.py）を変えてもこのマイグレーションの結果は変わらないよう、ここに固定する
+def normalize_search_text(value: str) -> str:
+    return unicodedata.normalize("NFKC", value.replace("-", "ｰ")).casefold()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        # 通常のテーブルと pg_trgm の GIN インデックス（キーは取引のID）
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS transaction_search "
+            "(transaction_id integer PRIMARY KEY, content text NOT NULL)"
+        )
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_transaction_search_content "
+            "ON transaction_search USING gin (content gin_trgm_ops)"
+        )
+        # 既存の取引を登録する
+        result = bind.execute(
+            sa.text("SELECT id, content FROM transactions").execution_options(
+                yield_per=FILL_CHUNK_SIZE
+            )
+        )
+        for rows in result.partitions():
+            bind.execute(
+                sa.text(
+                    "INSERT INTO transaction_search (transaction_id, content) "
+                    "VALUES (:transaction_id, :content)"
+                ),
+                [
+                    {
+                        "transaction_id": transaction_id,
+                        "content": normalize_search_text(content),
+                    }
+                    for transaction_id, content in rows
+                ],
+            )
+        return
+
+    # SQLite は FTS5 の仮想テーブル（trigram）。rowid は日付の序数を上位、IDを下位32ビットに詰める
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS transaction_search "
+        "USING fts5(content, tokenize='trigram')"
+    )
+    # 既存の取引を登録する（正規化を SQL の関数として登録し、1文で登録する）
+    # julianday から 1721424.5 を引くと date.toordinal と同じ値になる
+    bind.connection.dbapi_connection.create_function(
+        "normalize_search_text", 1, normalize_search_text, deterministic=True
+    )
+    op.execute(
+        """
+        INSERT INTO transaction_search (rowid, content)
+        SELECT (CAST(julianday(date) - 1721424.5 AS INTEGER) << 32) | id,
+            normalize_search_text(content)
+        FROM transactions
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS transaction_search")
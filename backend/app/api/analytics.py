@@ -0,0 +1,131 @@
+from datetime import date
+from typing import List, Literal, Optional
+
+from core.database import get_db
+from core.metrics import record_rows
+from fastapi import APIRouter, Depends, HTTPException, Query
+from schemas.analytics import AnalyticsTotals, PayeeTotal, SnapshotStats
+from schemas.transaction import TransactionSummary
+from services.analytics import LedgerSnapshot, ledger_snapshot
+from services.category_cache import category_cache
+from sqlalchemy.orm import Session
+
+# 全期間を対象にするレポート向けの集計API
+# services/analytics.py のプロセス内の列指向スナップショットから答え、DBには問い合わせない
+# （同期・非同期モードのどちらでも、スナップショットの作成には同期セッションを使う）
+router = APIRouter()
+
+
+def get_snapshot(db: Session = Depends(get_db)) -> LedgerSnapshot:
+    ledger_snapshot.ensure(db)
+    return ledger_snapshot
+
+
+def resolve_category(db: Session, name: Optional[str]) -> Optional[int]:
+    if name is None:
+        return None
+    category_id = category_cache.get_id(name)
+    if category_id is None:
+        category_cache.load(db)
+        category_id = category_cache.get_id(name)
+    if category_id is None:
+        raise HTTPException(status_code=400, detail=f"Unknown category: {name}")
+    return category_id
+
+
+# GET: 期間の収入・支出の合計と件数
+@router.get(
+    "/analytics/totals",
+    response_model=AnalyticsTotals,
+    operation_id="get_analytics_totals",
+)
+def read_totals(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    category: Optional[str] = None,
+    transaction_type: Optional[Literal["bank", "credit_card"]] = None,
+    db: Session = Depends(get_db),
+    snapshot: LedgerSnapshot = Depends(get_snapshot),
+):
+    totals = snapshot.totals(
+        date_from=date_from,
+        date_to=date_to,
+        category_id=resolve_category(db, category),
+        transaction_type=transaction_type,
+    )
+    return AnalyticsTotals(balance=totals["income"] - totals["expense"], **totals)
+
+
+# GET: 月別・年別・カテゴリ別の収支
+@router.get(
+    "/analytics/breakdown",
+    response_model=List[TransactionSummary],
+    operation_id="get_analytics_breakdown",
+)
+def read_breakdown(
+    group_by: Literal["month", "year", "category"] = "month",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    transaction_type: Optional[Literal["bank", "credit_card"]] = None,
+    db: Session = Depends(get_db),
+    snapshot: LedgerSnapshot = Depends(get_snapshot),
+):
+    rows = snapshot.breakdown(
+        group_by,
+        date_from=date_from,
+        date_to=date_to,
+        transaction_type=transaction_type,
+    )
+    if group_by == "category" and not category_cache.has_ids(key for key, _, _ in rows):
+        category_cache.load(db)
+    record_rows(len(rows))
+    return [
+        TransactionSummary(
+            key=category_cache.get_name(key) if group_by == "category" else key,
+            income=income,
+            expense=expense,
+            balance=income - expense,
+        )
+        for key, income, expense in rows
+    ]
+
+
+# GET: 金額の合計が大きい支払先
+@router.get(
+    "/analytics/top-payees",
+    response_model=List[PayeeTotal],
+    operation_id="get_analytics_top_payees",
+)
+def read_top_payees(
+    limit: int = Query(10, ge=1, le=100),
+    type: Literal["income", "expense"] = "expense",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    category: Optional[str] = None,
+    transaction_type: Optional[Literal["bank", "credit_card"]] = None,
+    db: Session = Depends(get_db),
+    snapshot: LedgerSnapshot = Depends(get_snapshot),
+):
+    payees = snapshot.top_payees(
+        limit,
+        type=type,
+        date_from=date_from,
+        date_to=date_to,
+        category_id=resolve_category(db, category),
+        transaction_type=transaction_type,
+    )
+    record_rows(len(payees))
+    return [
+        PayeeTotal(content=content, amount=amount, count=count)
+        for content, amount, count in payees
+    ]
+
+
+# GET: スナップショットの行数とメモリ使用量
+@router.get(
+    "/analytics/snapshot",
+    response_model=SnapshotStats,
+    operation_id="get_analytics_snapshot",
+)
+def read_snapshot_stats():
+    return SnapshotStats(**ledger_snapshot.stats())
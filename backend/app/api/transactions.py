@@ -1,15 +1,43 @@
+import csv
+import io
+import json
 import logging  # ロギング用のインポート
-from typing import List, Optional
+from datetime import date
+from typing import Any, AsyncIterator, List, Literal, Optional, Tuple
 
-from core.database import get_db
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from schemas.transaction import Transaction, TransactionCreate, TransactionResponse
+from core.cache import ledger_etag, response_cache
+from core.config import settings
+from core.database import SessionLocal, get_db
+from core.metrics import record_rows
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from schemas.transaction import (
+    BulkTransactionError,
+    BulkTransactionResponse,
+    RecategorizeResponse,
+    Transaction,
+    TransactionCreate,
+    TransactionResponse,
+    TransactionSummary,
+    format_validation_error,
+)
+from services.categorizer import load_categorizer
+from services.category_cache import category_cache
+from services.ledger_version import get_ledger_version
 from services.transaction import (
     create_transaction,
+    create_transactions_bulk,
     delete_transaction,
+    encode_cursor,
     get_transaction_by_id,
+    get_transaction_summary,
     get_transactions,
+    iter_transaction_chunks,
+    recategorize_transactions,
+    search_transactions,
     update_transaction,
 )
 from sqlalchemy.exc import SQLAlchemyError  # SQLAlchemyエラーのインポート
@@ -21,13 +49,275 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# 次ページのカーソルを返すレスポンスヘッダー
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# 検索語の最大の長さ
+SEARCH_QUERY_MAX_LENGTH = 100
+
+
+# ORMオブジェクトとカテゴリ名からレスポンス用のスキーマを作成
+def to_transaction_schema(transaction, category_name: str) -> Transaction:
+    return Transaction(
+        id=transaction.id,
+        date=transaction.date,
+        amount=int(transaction.amount),
+        content=transaction.content,
+        type=transaction.type,
+        category=category_name,
+        source=transaction.source,
+        transaction_type=transaction.transaction_type,
+    )
+
+
+# limit + 1 件取得した結果を1ページ分に切り詰め、続きがあればカーソルをヘッダーで返す
+def to_transaction_page(rows, limit: int) -> Tuple[List[Transaction], dict]:
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_transaction = rows[-1][0]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            last_transaction.date, last_transaction.id
+        )
+    items = [to_transaction_schema(t, category_name) for t, category_name in rows]
+    record_rows(len(items))
+    return items, headers
+
+
+def to_summary_schema(rows) -> List[TransactionSummary]:
+    record_rows(len(rows))
+    return [
+        TransactionSummary(
+            key=str(row.key),
+            income=int(row.income),
+            expense=int(row.expense),
+            balance=int(row.income) - int(row.expense),
+        )
+        for row in rows
+    ]
+
+
+# 読み込み系エンドポイントのキャッシュを確認する
+# DBの台帳バージョン（主キーでの1行の読み込み）から ETag を作り、
+# If-None-Match が一致すれば 304 を返し、取引は問い合わせない
+# 戻り値は (キャッシュ済みのレスポンスまたは None, 保存用のキー)
+def lookup_cached_response(
+    request: Request, db: Session
+) -> Tuple[Optional[Response], Optional[tuple]]:
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None, None
+    return check_cached_response(request, get_ledger_version(db))
+
+
+# 台帳バージョンは取引より先に読む（その後に書き込みがあっても、キャッシュには
+# そのバージョン以降の内容が入るだけで、古い内容が新しいバージョンで返ることはない）
+def check_cached_response(
+    request: Request, version: int
+) -> Tuple[Optional[Response], Optional[tuple]]:
+    etag = ledger_etag(version)
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (value.strip() for value in if_none_match.split(",")):
+        return Response(status_code=304, headers={"ETag": etag}), None
+
+    key = (request.url.path, version, tuple(sorted(request.query_params.multi_items())))
+    entry = response_cache.get(key)
+    if entry is None:
+        return None, key
+    body, headers = entry
+    return _cached_json_response(body, headers, etag), key
+
+
+def _cached_json_response(body: bytes, headers: dict, etag: str) -> Response:
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={**headers, "ETag": etag, "Cache-Control": "no-cache"},
+    )
+
+
+# レスポンスをシリアライズし、キーがあればキャッシュに保存して返す
+def json_response(content, headers: dict, key: Optional[tuple]) -> Response:
+    if key is None:
+        return JSONResponse(content=jsonable_encoder(content), headers=headers)
+    body = JSONResponse(content=jsonable_encoder(content)).body
+    response_cache.set(key, (body, headers))
+    return _cached_json_response(body, headers, ledger_etag(key[1]))
+
 
 # GET: 取引を取得するエンドポイント
+# (date, id) 順のキーセットページネーション。続きがある場合は X-Next-Cursor ヘッダーを返す
 @router.get(
     "/transactions", response_model=List[Transaction], operation_id="get_transactions"
 )
-def read_transactions(db: Session = Depends(get_db)):
-    return get_transactions(db)
+def read_transactions(
+    request: Request,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    type: Optional[Literal["income", "expense"]] = None,
+    category: Optional[str] = None,
+    source: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    cached, key = lookup_cached_response(request, db)
+    if cached is not None:
+        return cached
+
+    try:
+        # 次ページの有無を判定するため1件多く取得
+        rows = get_transactions(
+            db,
+            date_from=date_from,
+            date_to=date_to,
+            type=type,
+            category=category,
+            source=source,
+            cursor=cursor,
+            limit=limit + 1,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    items, headers = to_transaction_page(rows, limit)
+    return json_response(items, headers, key)
+
+
+# GET: 日別・月別・カテゴリ別の収支を集計するエンドポイント
+@router.get(
+    "/transactions/summary",
+    response_model=List[TransactionSummary],
+    operation_id="get_transaction_summary",
+)
+def read_transaction_summary(
+    request: Request,
+    group_by: Literal["day", "month", "category"] = "month",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    cached, key = lookup_cached_response(request, db)
+    if cached is not None:
+        return cached
+
+    rows = get_transaction_summary(db, group_by, date_from=date_from, date_to=date_to)
+    return json_response(to_summary_schema(rows), {}, key)
+
+
+# GET: 内容（支払先）に検索語を含む取引を新しい順に返すエンドポイント
+# 検索インデックス（services/search_index.py）を使い、検索語は取り込み時と同じく正規化する
+@router.get(
+    "/transactions/search",
+    response_model=List[Transaction],
+    operation_id="search_transactions",
+)
+def read_search_results(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=SEARCH_QUERY_MAX_LENGTH),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    type: Optional[Literal["income", "expense"]] = None,
+    category: Optional[str] = None,
+    source: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    cached, key = lookup_cached_response(request, db)
+    if cached is not None:
+        return cached
+
+    try:
+        rows = search_transactions(
+            db,
+            q,
+            limit,
+            date_from=date_from,
+            date_to=date_to,
+            type=type,
+            category=category,
+            source=source,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    items, headers = to_transaction_page(rows, limit)
+    return json_response(items, headers, key)
+
+
+# エクスポートする列（CSVのヘッダー順）
+EXPORT_COLUMNS = [
+    "id",
+    "date",
+    "amount",
+    "content",
+    "type",
+    "category",
+    "source",
+    "transaction_type",
+]
+
+
+def _export_row(row) -> list:
+    return [
+        row.id,
+        row.date.isoformat(),
+        int(row.amount),
+        row.content,
+        row.type,
+        row.category,
+        row.source,
+        row.transaction_type,
+    ]
+
+
+# エクスポートの本文をチャンク単位で生成する
+# レスポンス送信中もセッションを使い続けるため、依存性注入ではなく自前でセッションを開く
+def _generate_export(export_format: str, date_from, date_to):
+    db = SessionLocal()
+    try:
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            yield buffer.getvalue()
+            for chunk in iter_transaction_chunks(db, date_from, date_to):
+                record_rows(len(chunk))
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(_export_row(row) for row in chunk)
+                yield buffer.getvalue()
+        else:
+            for chunk in iter_transaction_chunks(db, date_from, date_to):
+                record_rows(len(chunk))
+                yield "".join(
+                    json.dumps(
+                        dict(zip(EXPORT_COLUMNS, _export_row(row))), ensure_ascii=False
+                    )
+                    + "\n"
+                    for row in chunk
+                )
+    finally:
+        db.close()
+
+
+# GET: 取引をNDJSONまたはCSVでストリーミング出力するエンドポイント
+@router.get("/transactions/export", operation_id="export_transactions")
+def export_transactions(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+):
+    if export_format == "csv":
+        media_type = "text/csv; charset=utf-8"
+    else:
+        media_type = "application/x-ndjson"
+    return StreamingResponse(
+        _generate_export(export_format, date_from, date_to),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="transactions.{export_format}"'
+        },
+    )
 
 
 # POST: 取引を追加するエンドポイント
@@ -42,6 +332,9 @@ def add_transaction(transaction: TransactionCreate, db: Session = Depends(get_db
         # IDをstr型で返す
         return TransactionResponse(id=db_transaction.id)
 
+    except ValueError as e:  # 存在しないカテゴリなど
+        raise HTTPException(status_code=400, detail=str(e))
+
     except SQLAlchemyError as e:  # SQLAlchemyのエラーを捕捉
         logger.error(
             f"Error occurred while adding transaction: {e}"
@@ -59,6 +352,179 @@ def add_transaction(transaction: TransactionCreate, db: Session = Depends(get_db
         )  # 500 Internal Server Errorを返す
 
 
+# NDJSON の一括登録で、1回に検証・登録する行数
+# リクエストボディは受信しながら解析し、全体をメモリに読み込まない
+BULK_STREAM_BATCH_SIZE = 5000
+
+
+# 1件を検証し、transactions（位置と取引）か errors に加える
+def _validate_bulk_item(index: int, item, transactions: list, errors: list):
+    if isinstance(item, ValueError):
+        errors.append(BulkTransactionError(index=index, detail=f"Invalid JSON: {item}"))
+        return
+    try:
+        transactions.append((index, TransactionCreate.parse_obj(item)))
+    except ValidationError as e:
+        errors.append(
+            BulkTransactionError(index=index, detail=format_validation_error(e))
+        )
+
+
+# NDJSON のリクエストボディを受信しながら行に分け、解析した値（不正な行は ValueError）を返す
+async def _iter_ndjson_items(request: Request) -> AsyncIterator[Any]:
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_ndjson_line(line)
+    if buffer.strip():
+        yield _parse_ndjson_line(buffer)
+
+
+def _parse_ndjson_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+
+async def _iter_bulk_batches(items: AsyncIterator[Any], batch_size: int):
+    transactions = []
+    errors = []
+    index = 0
+    async for item in items:
+        _validate_bulk_item(index, item, transactions, errors)
+        index += 1
+        if len(transactions) >= batch_size:
+            yield transactions, errors
+            transactions, errors = [], []
+    if transactions or errors:
+        yield transactions, errors
+
+
+async def _iter_list(items: list) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
+# 一括登録のリクエストボディ（JSON配列またはNDJSON）を解析する
+# ([(位置, TransactionCreate)], [BulkTransactionError]) の組を順に返す非同期イテレータを返す
+# - JSON配列: 本文全体を読み込んで検証し、1つの組にまとめる（1つのDBトランザクションで登録する）
+# - NDJSON: 受信しながら BULK_STREAM_BATCH_SIZE 件ずつの組にする（組ごとに登録・コミットする）
+async def parse_bulk_transactions(request: Request):
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type:
+        return _iter_bulk_batches(_iter_ndjson_items(request), BULK_STREAM_BATCH_SIZE)
+
+    body = await request.body()
+    try:
+        items = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body.")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array.")
+    return _iter_bulk_batches(_iter_list(items), max(len(items), 1))
+
+
+# 一括登録のリクエストボディ（OpenAPI用）
+BULK_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "application/json": {
+            "schema": {
+                "type": "array",
+                "items": {"$ref": "#/components/schemas/TransactionCreate"},
+            }
+        },
+        "application/x-ndjson": {"schema": {"type": "string"}},
+    },
+}
+
+
+# POST: 取引を一括で追加するエンドポイント
+@router.post(
+    "/transactions/bulk",
+    response_model=BulkTransactionResponse,
+    operation_id="post_transactions_bulk",
+    openapi_extra={"requestBody": BULK_REQUEST_BODY},
+)
+async def add_transactions_bulk(
+    batches=Depends(parse_bulk_transactions), db: Session = Depends(get_db)
+):
+    ids = []
+    errors = []
+    received = 0
+    try:
+        async for batch, batch_errors in batches:
+            errors.extend(batch_errors)
+            received += len(batch)
+            if batch:
+                # 同期版のサービスはスレッドプールで実行する（受信はイベントループで続ける）
+                ids.extend(
+                    await run_in_threadpool(
+                        create_transactions_bulk, db, [t for _, t in batch]
+                    )
+                )
+        return BulkTransactionResponse(
+            ids=ids, errors=errors, skipped=received - len(ids)
+        )
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error occurred while adding transactions in bulk: {e}")
+        raise HTTPException(status_code=400, detail="Transactions could not be added.")
+
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+# POST: ルールに従って既存の取引のカテゴリを一括で付け替えるエンドポイント
+# ルールは CATEGORY_RULES_PATH のJSON（更新されると次のリクエストで読み直す）
+@router.post(
+    "/transactions/recategorize",
+    response_model=RecategorizeResponse,
+    operation_id="recategorize_transactions",
+)
+def recategorize_transactions_endpoint(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    type: Optional[Literal["income", "expense"]] = None,
+    category: Optional[str] = None,
+    source: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    try:
+        categorizer = load_categorizer(settings.CATEGORY_RULES_PATH)
+        scanned, updated = recategorize_transactions(
+            db,
+            categorizer,
+            date_from=date_from,
+            date_to=date_to,
+            type=type,
+            category=category,
+            source=source,
+        )
+        return RecategorizeResponse(scanned=scanned, updated=updated)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error occurred while recategorizing transactions: {e}")
+        raise HTTPException(
+            status_code=400, detail="Transactions could not be recategorized."
+        )
+
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
 # PUT: 取引を更新するエンドポイント
 @router.put(
     "/transactions/{transaction_id}",
@@ -78,7 +544,16 @@ def update_transaction_endpoint(
 
         # 取引を更新
         updated_transaction = update_transaction(db, transaction, updated_transaction)
-        return updated_transaction
+        return to_transaction_schema(
+            updated_transaction,
+            category_cache.get_name(updated_transaction.category_id),
+        )
+
+    except HTTPException:
+        raise
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     except SQLAlchemyError as e:
         logger.error(f"Error occurred while updating transaction: {e}")
@@ -102,6 +577,9 @@ def delete_transaction_endpoint(transaction_id: int, db: Session = Depends(get_d
         delete_transaction(db, transaction)
         return {"message": "Transaction deleted successfully"}
 
+    except HTTPException:
+        raise
+
     except SQLAlchemyError as e:
         logger.error(f"Error occurred while deleting transaction: {e}")
         raise HTTPException(status_code=400, detail="Transaction could not be deleted.")
@@ -0,0 +1,281 @@
+import logging  # ロギング用のインポート
+from datetime import date
+from typing import List, Literal, Optional
+
+from api import transactions
+from api.transactions import (
+    BULK_REQUEST_BODY,
+    SEARCH_QUERY_MAX_LENGTH,
+    check_cached_response,
+    json_response,
+    parse_bulk_transactions,
+    to_summary_schema,
+    to_transaction_page,
+    to_transaction_schema,
+)
+from core.config import settings
+from core.database import get_async_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from schemas.transaction import (
+    BulkTransactionResponse,
+    Transaction,
+    TransactionCreate,
+    TransactionResponse,
+    TransactionSummary,
+)
+from services.ledger_version import build_version_statement
+from services.transaction_async import (
+    create_transaction,
+    create_transactions_bulk,
+    delete_transaction,
+    get_transaction_by_id,
+    get_transaction_summary,
+    get_transactions,
+    search_transactions,
+    update_transaction,
+)
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# ロガーの設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 非同期モード（settings.ASYNC_DB）用のルーター
+# パス・レスポンスは api/transactions.py の同期版と同じ
+router = APIRouter()
+
+
+# api/transactions.py の lookup_cached_response の非同期版
+async def lookup_cached_response(request: Request, db: AsyncSession):
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None, None
+    version = await db.scalar(build_version_statement())
+    return check_cached_response(request, version or 0)
+
+
+# GET: 取引を取得するエンドポイント
+@router.get(
+    "/transactions", response_model=List[Transaction], operation_id="get_transactions"
+)
+async def read_transactions(
+    request: Request,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    type: Optional[Literal["income", "expense"]] = None,
+    category: Optional[str] = None,
+    source: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    cached, key = await lookup_cached_response(request, db)
+    if cached is not None:
+        return cached
+
+    try:
+        rows = await get_transactions(
+            db,
+            date_from=date_from,
+            date_to=date_to,
+            type=type,
+            category=category,
+            source=source,
+            cursor=cursor,
+            limit=limit + 1,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    items, headers = to_transaction_page(rows, limit)
+    return json_response(items, headers, key)
+
+
+# GET: 日別・月別・カテゴリ別の収支を集計するエンドポイント
+@router.get(
+    "/transactions/summary",
+    response_model=List[TransactionSummary],
+    operation_id="get_transaction_summary",
+)
+async def read_transaction_summary(
+    request: Request,
+    group_by: Literal["day", "month", "category"] = "month",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    cached, key = await lookup_cached_response(request, db)
+    if cached is not None:
+        return cached
+
+    rows = await get_transaction_summary(
+        db, group_by, date_from=date_from, date_to=date_to
+    )
+    return json_response(to_summary_schema(rows), {}, key)
+
+
+# GET: 内容（支払先）に検索語を含む取引を新しい順に返すエンドポイント
+@router.get(
+    "/transactions/search",
+    response_model=List[Transaction],
+    operation_id="search_transactions",
+)
+async def read_search_results(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=SEARCH_QUERY_MAX_LENGTH),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    type: Optional[Literal["income", "expense"]] = None,
+    category: Optional[str] = None,
+    source: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    cached, key = await lookup_cached_response(request, db)
+    if cached is not None:
+        return cached
+
+    try:
+        rows = await search_transactions(
+            db,
+            q,
+            limit,
+            date_from=date_from,
+            date_to=date_to,
+            type=type,
+            category=category,
+            source=source,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    items, headers = to_transaction_page(rows, limit)
+    return json_response(items, headers, key)
+
+
+# POST: 取引を追加するエンドポイント
+@router.post(
+    "/transactions", response_model=TransactionResponse, operation_id="post_transaction"
+)
+async def add_transaction(
+    transaction: TransactionCreate, db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        db_transaction = await create_transaction(db, transaction)
+        return TransactionResponse(id=db_transaction.id)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error occurred while adding transaction: {e}")
+        raise HTTPException(status_code=400, detail="Transaction could not be added.")
+
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+# POST: 取引を一括で追加するエンドポイント
+@router.post(
+    "/transactions/bulk",
+    response_model=BulkTransactionResponse,
+    operation_id="post_transactions_bulk",
+    openapi_extra={"requestBody": BULK_REQUEST_BODY},
+)
+async def add_transactions_bulk(
+    batches=Depends(parse_bulk_transactions),
+    db: AsyncSession = Depends(get_async_db),
+):
+    ids = []
+    errors = []
+    received = 0
+    try:
+        async for batch, batch_errors in batches:
+            errors.extend(batch_errors)
+            received += len(batch)
+            if batch:
+                ids.extend(await create_transactions_bulk(db, [t for _, t in batch]))
+        return BulkTransactionResponse(
+            ids=ids, errors=errors, skipped=received - len(ids)
+        )
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error occurred while adding transactions in bulk: {e}")
+        raise HTTPException(status_code=400, detail="Transactions could not be added.")
+
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+# PUT: 取引を更新するエンドポイント
+@router.put(
+    "/transactions/{transaction_id}",
+    response_model=Transaction,
+    operation_id="update_transaction",
+)
+async def update_transaction_endpoint(
+    transaction_id: int,
+    updated_transaction: TransactionCreate,
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        transaction = await get_transaction_by_id(db, transaction_id)
+        if not transaction:
+            raise HTTPException(status_code=404, detail="Transaction not found")
+
+        transaction = await update_transaction(db, transaction, updated_transaction)
+        # 非同期セッションでは遅延ロードできないため、カテゴリ名はリクエストの値を使う
+        return to_transaction_schema(transaction, updated_transaction.category)
+
+    except HTTPException:
+        raise
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error occurred while updating transaction: {e}")
+        raise HTTPException(status_code=400, detail="Transaction could not be updated.")
+
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+# DELETE: 取引を削除するエンドポイント
+@router.delete("/transactions/{transaction_id}", operation_id="delete_transaction")
+async def delete_transaction_endpoint(
+    transaction_id: int, db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        transaction = await get_transaction_by_id(db, transaction_id)
+        if not transaction:
+            raise HTTPException(status_code=404, detail="Transaction not found")
+
+        await delete_transaction(db, transaction)
+        return {"message": "Transaction deleted successfully"}
+
+    except HTTPException:
+        raise
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error occurred while deleting transaction: {e}")
+        raise HTTPException(status_code=400, detail="Transaction could not be deleted.")
+
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+# 非同期版のないエンドポイント（エクスポートなど）は同期版をそのまま使う
+_async_routes = {
+    (route.path, method) for route in router.routes for method in route.methods
+}
+for route in transactions.router.routes:
+    if not any((route.path, method) in _async_routes for method in route.methods):
+        router.routes.append(route)
@@ -0,0 +1,15 @@
+"""
+テーブルを作成し、カテゴリの初期データを投入する（作成済みの場合は何もしない）。
+複数ワーカーで動かす場合は、起動前にこのコマンドを1回実行して DB_INIT_ON_STARTUP=false にする。
+
+    cd backend/app && python -m commands.init_db
+"""
+
+from core.database import engine
+from core.startup import initialize_database
+
+if __name__ == "__main__":
+    if initialize_database(engine):
+        print("Initialized the database.")
+    else:
+        print("The database is already initialized.")
@@ -0,0 +1,17 @@
+"""
+月別・カテゴリ別の集計テーブル（monthly_category_totals）を transactions から作り直す。
+
+    cd backend/app && python -m commands.rebuild_monthly_totals
+"""
+
+from core.database import SessionLocal
+from models.transaction import MonthlyCategoryTotal
+from services.monthly_totals import rebuild_monthly_category_totals
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        rebuild_monthly_category_totals(db)
+        print(f"Rebuilt {db.query(MonthlyCategoryTotal).count()} monthly totals.")
+    finally:
+        db.close()
@@ -0,0 +1,18 @@
+"""
+取引の内容の検索インデックス（transaction_search）を transactions から作り直す。
+
+    cd backend/app && python -m commands.rebuild_search_index
+"""
+
+from core.database import SessionLocal
+from services.search_index import SEARCH_TABLE, rebuild_search_index
+from sqlalchemy import func, select, table
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        rebuild_search_index(db)
+        count = db.scalar(select(func.count()).select_from(table(SEARCH_TABLE)))
+        print(f"Rebuilt the search index ({count} transactions).")
+    finally:
+        db.close()
@@ -0,0 +1,53 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from core.config import settings
+
+
+# TTL付きのLRUキャッシュ（スレッドセーフ）
+class TTLCache:
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# ETag に含めるプロセスごとの識別子
+# 台帳のバージョン（services/ledger_version.py）はDBの値のため、DBを作り直すと同じ値に戻ることがある
+_epoch = uuid.uuid4().hex[:8]
+
+# シリアライズ済みのレスポンス（一覧・集計）のキャッシュ
+# キーに台帳のバージョンを含めるため、書き込み後の古いエントリは使われずに追い出される
+response_cache = TTLCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES, ttl=settings.RESPONSE_CACHE_TTL
+)
+
+
+def ledger_etag(version: int) -> str:
+    return f'W/"{_epoch}-{version}"'
@@ -5,6 +5,55 @@ class Settings(BaseSettings):
     # DB接続のための環境変数
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./finance.db")
 
+    # 非同期モード（True の場合、APIは AsyncSession を使う非同期ハンドラで動作する）
+    # SQLite は aiosqlite、PostgreSQL は asyncpg のドライバが必要
+    ASYNC_DB: bool = False
+
+    # コネクションプールの設定（PostgreSQL など SQLite 以外で使用）
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # 接続の取得を待つ秒数
+    DB_POOL_RECYCLE: int = 1800  # 接続を作り直すまでの秒数（-1 で無効）
+    DB_POOL_PRE_PING: bool = True  # 接続の取得時に生存確認を行う
+
+    # SQLite の接続ごとに設定する PRAGMA（False の場合は SQLite の既定値のまま）
+    SQLITE_PRAGMAS: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # バイト
+    SQLITE_CACHE_SIZE: int = -64 * 1024  # 負の値は KiB 単位
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_BUSY_TIMEOUT: int = 5000  # ミリ秒
+
+    # 起動時（lifespan）にテーブルの作成とカテゴリの投入が必要か確認する
+    # False の場合は python -m commands.init_db か Alembic で事前に作成しておく
+    DB_INIT_ON_STARTUP: bool = True
+    # 起動にかかった時間がこれを超えた場合は WARNING でログに出す
+    STARTUP_TIME_TARGET_MS: int = 500
+
+    # 一覧・集計・検索レスポンスのキャッシュと ETag（キャッシュはプロセス内）
+    # キーと ETag はDBの台帳バージョン（ledger_state）から作るため、複数ワーカーや
+    # finance の直接取り込みなど他のプロセスの書き込みもすぐに反映される（無効にする必要はない）
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 256
+    RESPONSE_CACHE_TTL: int = 300  # 秒
+
+    # 分析API（/api/analytics）の列指向スナップショット（services/analytics.py）を作り直す間隔（秒）
+    # 他のプロセスからの書き込み（finance の直接取り込みなど）は台帳バージョン（ledger_state）の変化で
+    # 次のリクエストで作り直すため、これは念のための上限。0 の場合は時間では作り直さない
+    ANALYTICS_SNAPSHOT_TTL: int = 3600
+
+    # リクエストごとの性能指標（GET /metrics で Prometheus 形式で返す）
+    METRICS_ENABLED: bool = True
+    # SLOW_QUERY_THRESHOLD_MS 以上かかったクエリを WARNING でログに出す
+    SLOW_QUERY_LOG: bool = False
+    SLOW_QUERY_THRESHOLD_MS: int = 200
+
+    # 自動カテゴリ分類のルール（JSON。services/categorizer.py を参照）
+    CATEGORY_RULES_PATH: str = os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), "seeds", "category_rules.json"
+    )
+
     class Config:
         env_file = ".env"
 
@@ -1,18 +1,67 @@
 from core.config import settings
-from sqlalchemy import create_engine
+from core.metrics import instrument_engine, instrument_sessions
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+# エンジンの作成オプション（同期・非同期で共通）
+def engine_options(url: str) -> dict:
+    if is_sqlite(url):
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+# SQLite の接続ごとに PRAGMA を設定する
+# WAL により書き込み中も読み込みがブロックされず、synchronous=NORMAL でコミットごとの fsync を減らす
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA temp_store={settings.SQLITE_TEMP_STORE}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}")
+    cursor.close()
+
+
+def create_db_engine(url: str):
+    db_engine = create_engine(url, **engine_options(url))
+    if is_sqlite(url) and settings.SQLITE_PRAGMAS:
+        event.listen(db_engine, "connect", set_sqlite_pragmas)
+    if settings.METRICS_ENABLED:
+        instrument_engine(db_engine)
+    return db_engine
+
+
+# ON CONFLICT を使う方言ごとの insert() を返す
+# PostgreSQL の方言（asyncpg などのモジュールを含む）は使う場合だけ読み込み、起動を速くする
+def dialect_insert(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
 
 # データベースエンジンの作成
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}
-    if "sqlite" in settings.DATABASE_URL
-    else {},
-)
+engine = create_db_engine(settings.DATABASE_URL)
 
 # セッションの作成
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if settings.METRICS_ENABLED:
+    # 同期・非同期のセッションの両方に効くよう、Session クラスに設定する
+    instrument_sessions(Session)
 
 # ベースクラスの作成
 Base = declarative_base()
@@ -25,3 +74,38 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# 同期用のURLを非同期ドライバのURLに変換する
+def to_async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+
+# 非同期モードの場合のみ非同期エンジンを作成する（ドライバは任意の依存関係）
+async_engine = None
+AsyncSessionLocal = None
+if settings.ASYNC_DB:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        to_async_url(settings.DATABASE_URL), **engine_options(settings.DATABASE_URL)
+    )
+    if is_sqlite(settings.DATABASE_URL) and settings.SQLITE_PRAGMAS:
+        event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+    if settings.METRICS_ENABLED:
+        instrument_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+# 非同期データベースセッションの取得
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
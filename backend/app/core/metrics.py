@@ -0,0 +1,238 @@
+"""
+リクエスト単位の性能指標を集め、Prometheus のテキスト形式で返す。
+
+- MetricsMiddleware: ルート（パスのテンプレート）ごとのレイテンシ、リクエスト中のクエリ数・DB時間・返した行数
+- instrument_engine: SQLAlchemy のカーソルイベントでクエリ数・時間を数える
+- instrument_sessions: セッションのイベントで、DBトランザクションの開始から接続を得るまでの時間を測る
+- SLOW_QUERY_LOG=true の場合は、SLOW_QUERY_THRESHOLD_MS 以上かかったクエリをログに出す
+
+指標はプロセス内の値（複数ワーカーの場合はワーカーごと）。外部のライブラリには依存しない。
+"""
+
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+from core.config import settings
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# レイテンシ（秒）のバケット
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# 件数（クエリ数・行数）のバケット
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500, 1000, 5000, 10000)
+
+# スロークエリのログに出すSQLの最大文字数
+SLOW_QUERY_MAX_LENGTH = 1000
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# ラベルごとの値を持つヒストグラム（スレッドセーフ）
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # ラベルの値 -> [バケットごとの件数..., 合計, 件数]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for label_values, series in items:
+            for bound, count in zip(self.buckets, series):
+                labels = _format_labels(
+                    self.labels, label_values, f'le="{_format_number(bound)}"'
+                )
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labels, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_number(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return "\n".join(lines)
+
+
+REQUEST_LABELS = ("method", "route")
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, including the response body.",
+    REQUEST_LABELS + ("status",),
+)
+request_queries = Histogram(
+    "http_request_db_queries",
+    "Number of database queries executed per request.",
+    REQUEST_LABELS,
+    COUNT_BUCKETS,
+)
+request_db_time = Histogram(
+    "http_request_db_seconds",
+    "Time spent executing database queries per request.",
+    REQUEST_LABELS,
+)
+request_rows = Histogram(
+    "http_request_rows",
+    "Number of database rows returned to the client per request "
+    "(0 for cached responses).",
+    REQUEST_LABELS,
+    COUNT_BUCKETS,
+)
+connection_acquire = Histogram(
+    "db_connection_acquire_seconds",
+    "Time from starting a session transaction until it has a database connection "
+    "(pool checkout, opening a new connection if needed, and BEGIN).",
+)
+
+REGISTRY = (
+    request_duration,
+    request_queries,
+    request_db_time,
+    request_rows,
+    connection_acquire,
+)
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# 処理中のリクエストの集計（同期ハンドラのスレッドにもコンテキストごと引き継がれる）
+class RequestStats:
+    __slots__ = ("queries", "db_time", "rows")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def record_rows(count: int):
+    """処理中のリクエストがクライアントに返した行数を加える"""
+    stats = _current.get()
+    if stats is not None:
+        stats.rows += count
+
+
+class MetricsMiddleware:
+    """リクエストごとのレイテンシ・クエリ数・DB時間・行数を記録するASGIミドルウェア
+
+    ストリーミングのレスポンスも、本文を送り終えるまでを1リクエストとして測る。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            # パスそのものではなくテンプレートを使い、ラベルの種類が増えすぎないようにする
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            request_duration.observe(
+                time.perf_counter() - started, method, route_path, str(status)
+            )
+            request_queries.observe(stats.queries, method, route_path)
+            request_db_time.observe(stats.db_time, method, route_path)
+            request_rows.observe(stats.rows, method, route_path)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+    if settings.SLOW_QUERY_LOG and elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        logger.warning(
+            f"Slow query ({elapsed * 1000:.1f} ms): "
+            f"{statement[:SLOW_QUERY_MAX_LENGTH]} "
+            f"parameters={str(parameters)[:SLOW_QUERY_MAX_LENGTH]}"
+        )
+
+
+# セッションの（最上位の）DBトランザクションが作られてから、接続を得て BEGIN するまでを測る
+# プールの空きを待つ時間のほか、新しい接続を開く時間も含む
+def _after_transaction_create(session, transaction):
+    if transaction.parent is None:
+        session.info["transaction_started_at"] = time.perf_counter()
+
+
+def _after_begin(session, transaction, connection):
+    started = session.info.pop("transaction_started_at", None)
+    if started is not None:
+        connection_acquire.observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine):
+    """同期エンジン（非同期エンジンは sync_engine）にクエリの計測を設定する"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def instrument_sessions(session_class):
+    """セッションのクラス（非同期セッションも内部では同期の Session を使う）に接続の取得の計測を設定する"""
+    event.listen(session_class, "after_transaction_create", _after_transaction_create)
+    event.listen(session_class, "after_begin", _after_begin)
@@ -0,0 +1,75 @@
+"""
+起動時のスキーマ作成とカテゴリの初期データの投入。
+
+テーブル・検索インデックス・カテゴリがそろっていれば何もしない（確認は1回の接続で行う）。
+create_all で作ったDBは Alembic の head として記録する（その後は alembic upgrade head で移行できる）。
+アプリのインポート時には DB に接続せず、lifespan（DB_INIT_ON_STARTUP=true の場合）か
+コマンド（python -m commands.init_db）から呼ぶ。
+"""
+
+import logging
+from pathlib import Path
+
+from core.database import Base, SessionLocal
+from models.transaction import Category
+from seeds.category import seed_categories
+from services.search_index import (
+    SEARCH_TABLE,
+    create_search_index,
+    search_index_exists,
+)
+from sqlalchemy import inspect, select
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+# 初期化が失敗した場合（他のワーカーとの競合）に試す回数
+INIT_ATTEMPTS = 3
+
+ALEMBIC_DIR = Path(__file__).resolve().parents[2] / "alembic"
+ALEMBIC_VERSION_TABLE = "alembic_version"
+
+
+def stamp_alembic_head(connection):
+    """マイグレーションの記録がなければ、head まで適用済みとして記録する"""
+    if ALEMBIC_VERSION_TABLE in inspect(connection).get_table_names():
+        return
+    # 初期化が必要な場合だけ読み込む（起動時間のため）
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    script = ScriptDirectory(str(ALEMBIC_DIR))
+    MigrationContext.configure(connection).stamp(script, "head")
+
+
+def needs_initialization(db_engine) -> bool:
+    """テーブル・検索インデックスが足りない、またはカテゴリが1件もない場合に True を返す"""
+    with db_engine.connect() as connection:
+        existing = set(inspect(connection).get_table_names())
+        if not {*Base.metadata.tables, SEARCH_TABLE} <= existing:
+            return True
+        return connection.execute(select(Category.id).limit(1)).first() is None
+
+
+def initialize_database(db_engine) -> bool:
+    """必要な場合だけテーブルを作成してカテゴリを投入する（行った場合は True）"""
+    if not needs_initialization(db_engine):
+        return False
+    for attempt in range(1, INIT_ATTEMPTS + 1):
+        try:
+            # 作成済みのテーブル・検索インデックスは作らず、カテゴリは存在しないものだけ追加する
+            # （繰り返しても同じ結果）
+            Base.metadata.create_all(bind=db_engine)
+            with db_engine.begin() as connection:
+                if not search_index_exists(connection):
+                    create_search_index(connection)
+                # create_all の結果は head のスキーマと同じなので、マイグレーションと食い違わないよう記録する
+                stamp_alembic_head(connection)
+            with SessionLocal(bind=db_engine) as db:
+                seed_categories(db)
+            return True
+        except SQLAlchemyError as e:
+            # 同時に起動した別のワーカーが同じテーブルを作成した場合は、やり直す
+            if attempt == INIT_ATTEMPTS:
+                raise
+            logger.info(f"Retrying database initialization: {getattr(e, 'orig', e)}")
@@ -1,13 +1,41 @@
-from api import transactions
-from core.database import Base, SessionLocal, engine
-from fastapi import FastAPI
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from api import analytics, transactions
+from core.config import settings
+from core.database import SessionLocal, engine
+from core.metrics import MetricsMiddleware, render_metrics
+from core.startup import initialize_database
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from seeds.category import seed_categories
+from services.category_cache import category_cache
+
+logger = logging.getLogger(__name__)
+
+
+# 起動時の処理（インポート時には DB に接続しない）
+# テーブルの作成とカテゴリの投入は、足りない場合だけ行う（確認は1回の接続）
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    if settings.DB_INIT_ON_STARTUP and initialize_database(engine):
+        logger.info("Created tables and seeded categories.")
+    with SessionLocal() as db:
+        # カテゴリのキャッシュを読み込む
+        category_cache.load(db)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms > settings.STARTUP_TIME_TARGET_MS:
+        logger.warning(
+            f"Startup took {elapsed_ms:.0f} ms "
+            f"(target {settings.STARTUP_TIME_TARGET_MS} ms)"
+        )
+    else:
+        logger.info(f"Startup took {elapsed_ms:.0f} ms")
+    yield
 
-# データベーステーブルの作成
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 
 origins = ["*"]
@@ -18,16 +46,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[transactions.NEXT_CURSOR_HEADER],
 )
 
-# ルーティング
-app.include_router(transactions.router, prefix="/api")
-
-db = SessionLocal()
-try:
-    seed_categories(db)
-except Exception as e:
-    # エラーをログに出力する場合
-    print(f"Error seeding categories: {e}")
-finally:
-    db.close()
+# リクエストごとの性能指標（最後に追加したミドルウェアが最も外側で動くため、CORS の処理も含めて測る）
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(
+            content=render_metrics(), media_type="text/plain; version=0.0.4"
+        )
+
+
+# ルーティング（非同期モードでは AsyncSession を使うハンドラに切り替える）
+# 非同期のハンドラは使う場合だけ読み込む（起動時間の短縮）
+if settings.ASYNC_DB:
+    from api import transactions_async
+
+    app.include_router(transactions_async.router, prefix="/api")
+else:
+    app.include_router(transactions.router, prefix="/api")
+app.include_router(analytics.router, prefix="/api")
@@ -1,5 +1,14 @@
 from core.database import Base
-from sqlalchemy import Column, Date, ForeignKey, Integer, Numeric, String
+from sqlalchemy import (
+    Column,
+    Date,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    PrimaryKeyConstraint,
+    String,
+)
 from sqlalchemy.orm import relationship
 
 
@@ -7,7 +16,7 @@ class Category(Base):
     __tablename__ = "categories"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, nullable=False)  # カテゴリ名
+    name = Column(String, nullable=False, unique=True, index=True)  # カテゴリ名
     type = Column(String, nullable=False)  # タイプ名
     color = Column(String, nullable=False)  # カテゴリカラー
     icon_base64 = Column(String, nullable=True)  # Base64エンコードされたアイコンデータ
@@ -29,6 +38,41 @@ class Transaction(Base):
     category_id = Column(
         Integer, ForeignKey("categories.id"), nullable=False
     )  # カテゴリの外部キー
+    # 取り込み元の行から計算した指紋（同じ明細の重複登録を防ぐ。手入力の取引はNULL）
+    fingerprint = Column(String(64), nullable=True)
 
     # Categoryテーブルとのリレーションシップ
     category = relationship("Category", back_populates="transactions")
+
+    # 期間指定の一覧・集計で使うインデックス
+    __table_args__ = (
+        Index("ix_transactions_date", "date"),
+        Index("ix_transactions_type_date", "type", "date"),
+        Index("ix_transactions_category_id_date", "category_id", "date"),
+        Index("ix_transactions_fingerprint", "fingerprint", unique=True),
+    )
+
+
+# 月別・カテゴリ別の収支の集計テーブル
+# transactions への書き込みと同じDBトランザクションで差分を反映する（services/monthly_totals.py）
+class MonthlyCategoryTotal(Base):
+    __tablename__ = "monthly_category_totals"
+
+    month = Column(String(7), nullable=False)  # "YYYY-MM"
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
+    income = Column(Numeric, nullable=False, default=0)
+    expense = Column(Numeric, nullable=False, default=0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (PrimaryKeyConstraint("month", "category_id"),)
+
+
+# 台帳のバージョン（id=1 の1行だけ）
+# transactions への書き込みと同じDBトランザクションで進める（services/ledger_version.py）
+# 読み込み系APIの ETag・レスポンスのキャッシュはこの値で判定するため、
+# 他のプロセス（直接取り込み・別のワーカー）の書き込みも反映される
+class LedgerState(Base):
+    __tablename__ = "ledger_state"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
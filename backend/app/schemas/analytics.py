@@ -0,0 +1,24 @@
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+
+class AnalyticsTotals(BaseModel):
+    income: int
+    expense: int
+    balance: int
+    count: int  # 取引の件数
+
+
+class PayeeTotal(BaseModel):
+    content: str  # 取引の内容（支払先）
+    amount: int  # 金額の合計
+    count: int  # 取引の件数
+
+
+class SnapshotStats(BaseModel):
+    rows: int
+    built: bool
+    age_seconds: Optional[float] = None  # 作成からの経過秒数
+    memory: Dict[str, int]  # 列・辞書ごとのメモリ使用量（バイト）
+    memory_total: int
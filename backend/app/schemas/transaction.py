@@ -1,7 +1,7 @@
 from datetime import date
-from typing import Literal, Optional, Union
+from typing import List, Literal, Optional, Union
 
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, ValidationError, validator
 
 
 class TransactionBase(BaseModel):
@@ -28,7 +28,8 @@ class TransactionBase(BaseModel):
 
 
 class TransactionCreate(TransactionBase):
-    pass
+    # 取り込み元の行の指紋。同じ指紋の取引が既にあれば一括登録でスキップする
+    fingerprint: Optional[str] = None
 
 
 class Transaction(TransactionBase):
@@ -40,3 +41,34 @@ class Transaction(TransactionBase):
 
 class TransactionResponse(BaseModel):
     id: int
+
+
+class TransactionSummary(BaseModel):
+    key: str  # 集計キー（日付 "YYYY-MM-DD"、月 "YYYY-MM"、またはカテゴリ名）
+    income: int
+    expense: int
+    balance: int
+
+
+class BulkTransactionError(BaseModel):
+    index: int  # 送信されたデータ内の位置（0始まり）
+    detail: str
+
+
+class BulkTransactionResponse(BaseModel):
+    ids: List[int]  # 登録に成功した取引のID（送信順）
+    errors: List[BulkTransactionError]
+    skipped: int = 0  # 指紋が登録済みのためスキップした件数
+
+
+class RecategorizeResponse(BaseModel):
+    scanned: int  # 対象になった取引の件数
+    updated: int  # カテゴリを付け替えた件数
+
+
+# バリデーションエラーを1行の文字列にまとめる（一括登録APIと直接取り込みで共通）
+def format_validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+        for error in e.errors()
+    )
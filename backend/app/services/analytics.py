@@ -0,0 +1,443 @@
+"""
+分析用のクエリ（全期間の合計・月別/年別/カテゴリ別の内訳・支払先の上位）に使う、
+取引のプロセス内の列指向スナップショット。
+
+列は標準ライブラリの array に詰めて持つ（NumPy には依存しない）。
+
+- dates: 日付の序数（date.toordinal）。日付順に並べ、期間は二分探索で切り出す
+- amounts: 金額（int64）
+- categories: カテゴリのコード（カテゴリIDを0始まりの連番にしたもの）
+- flags: 収支タイプ・取引の種類のビットマスク（INCOME・EXPENSE・BANK・CREDIT_CARD）
+- payees: 内容（支払先）のコード（同じ文字列は1つにまとめる）
+- ids: 取引のID（更新・削除で位置を探す）
+
+集計では flags・categories のバイト列を bytes.translate で0/1のセレクタにし、
+itertools.compress で金額を選んで合計する（1行ごとの Python の処理を避ける）。
+categories は1バイトのコードなので、カテゴリは MAX_CATEGORIES 個までしか持てない。最初のクエリで DB から作り、その後は services の
+書き込み（登録・一括登録・更新・削除）で差分を反映する。カテゴリの一括付け替えでは作り直す。
+
+作成時にDBの台帳バージョン（services/ledger_version.py）を記録し、クエリのたびに読み直して
+違っていれば作り直す。このプロセスの書き込みは、進めたバージョンがちょうど1つ先の場合だけ
+記録を進めるため、他のワーカーや finance の直接取り込みなどの書き込みが間に入れば必ず作り直す。
+ANALYTICS_SNAPSHOT_TTL 秒ごとにも作り直す（DBを作り直してバージョンが同じ値に戻った場合など）。
+"""
+
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from datetime import date
+from functools import lru_cache
+from heapq import nlargest
+from itertools import compress, repeat
+from operator import itemgetter, or_
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.config import settings
+from models.transaction import Transaction
+from services.ledger_version import get_ledger_version
+from sqlalchemy import Integer, select, type_coerce
+from sqlalchemy.orm import Session
+
+# flags のビット
+INCOME = 1
+EXPENSE = 2
+BANK = 4
+CREDIT_CARD = 8
+
+TYPE_FLAGS = {"income": INCOME, "expense": EXPENSE}
+TRANSACTION_TYPE_FLAGS = {"bank": BANK, "credit_card": CREDIT_CARD}
+
+# categories は1バイトのコードで持つ（bytes.translate でセレクタを作るため）
+MAX_CATEGORIES = 256
+
+# DB から一度に読み込む行数
+BUILD_CHUNK_SIZE = 50_000
+
+# スナップショットの1行: (ID, 日付, 金額, カテゴリID, 収支タイプ, 取引の種類, 内容)
+Row = Tuple[int, date, int, int, str, Optional[str], str]
+
+
+def snapshot_row(transaction) -> Row:
+    """ORMオブジェクト（または同じ属性を持つオブジェクト）をスナップショットの行にする"""
+    return (
+        transaction.id,
+        transaction.date,
+        int(transaction.amount),
+        transaction.category_id,
+        transaction.type,
+        transaction.transaction_type,
+        transaction.content,
+    )
+
+
+@lru_cache(maxsize=None)
+def _mask_table(mask: int) -> bytes:
+    # flags の値 -> mask のビットがすべて立っていれば1
+    return bytes(int(value & mask == mask) for value in range(256))
+
+
+@lru_cache(maxsize=None)
+def _code_table(code: Optional[int]) -> bytes:
+    # カテゴリのコード -> code と一致すれば1
+    return bytes(int(value == code) for value in range(256))
+
+
+def _periods(dates: array, group_by: str, lo: int, hi: int):
+    # 日付順の dates の [lo, hi) を月・年ごとの区間 (キー, 開始, 終了) に分ける
+    start = lo
+    while start < hi:
+        first = date.fromordinal(dates[start])
+        if group_by == "year":
+            key = f"{first.year:04d}"
+            next_start = date(first.year + 1, 1, 1)
+        else:
+            key = f"{first.year:04d}-{first.month:02d}"
+            next_start = (
+                date(first.year + 1, 1, 1)
+                if first.month == 12
+                else date(first.year, first.month + 1, 1)
+            )
+        end = bisect_left(dates, next_start.toordinal(), start, hi)
+        yield key, start, end
+        start = end
+
+
+def _and(left: bytes, right: bytes) -> bytes:
+    # 0/1のセレクタ同士の AND（整数に変換してビット演算する）
+    return (int.from_bytes(left, "little") & int.from_bytes(right, "little")).to_bytes(
+        len(left), "little"
+    )
+
+
+def _empty_columns() -> dict:
+    return {
+        "ids": array("q"),
+        "dates": array("i"),
+        "amounts": array("q"),
+        "categories": array("B"),
+        "flags": array("B"),
+        "payees": array("I"),
+    }
+
+
+class LedgerSnapshot:
+    def __init__(self):
+        self._columns = _empty_columns()
+        self._category_ids: List[int] = []  # コード -> カテゴリID
+        self._category_codes: Dict[int, int] = {}  # カテゴリID -> コード
+        self._payees: List[str] = []  # コード -> 内容
+        self._payee_codes: Dict[str, int] = {}  # 内容 -> コード
+        # ID の昇順（既に持っている取引かどうかを二分探索で調べる）
+        self._sorted_ids = array("q")
+        self._built_at: Optional[float] = None
+        # 反映済みの台帳バージョン
+        self._version = 0
+        self._lock = threading.RLock()
+
+    # --- 作成・更新 ---
+
+    def ensure(self, db: Session):
+        """未作成、DBの台帳バージョンが反映済みのものと違う、または作成から
+        ANALYTICS_SNAPSHOT_TTL 秒を過ぎていれば DB から作り直す"""
+        version = get_ledger_version(db)
+        with self._lock:
+            ttl = settings.ANALYTICS_SNAPSHOT_TTL
+            if (
+                self._built_at is None
+                or version != self._version
+                or (ttl > 0 and time.monotonic() - self._built_at > ttl)
+            ):
+                self.build(db)
+
+    def build(self, db: Session):
+        statement = (
+            select(
+                Transaction.id,
+                Transaction.date,
+                # 金額は整数なので Decimal への変換を省く
+                type_coerce(Transaction.amount, Integer),
+                Transaction.category_id,
+                Transaction.type,
+                Transaction.transaction_type,
+                Transaction.content,
+            )
+            .order_by(Transaction.date, Transaction.id)
+            .execution_options(yield_per=BUILD_CHUNK_SIZE)
+        )
+        with self._lock:
+            # 行より先に読む（間に入った書き込みは、記録より新しい行として含まれるだけで済む）
+            self._version = get_ledger_version(db)
+            self._columns = _empty_columns()
+            self._category_ids, self._category_codes = [], {}
+            self._payees, self._payee_codes = [], {}
+            # ORMの結果の処理を通さず、列の値だけを読む
+            for rows in db.connection().execute(statement).tuples().partitions():
+                self._extend(self._columns, rows)
+            self._sorted_ids = array("q", sorted(self._columns["ids"]))
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        """次のクエリで作り直す"""
+        with self._lock:
+            self._built_at = None
+
+    def _advance(self, version: int):
+        # 書き込みで進めた台帳バージョンが反映済みのちょうど1つ先なら記録を進める
+        # （それ以外は間に反映していない書き込みがあるため、次のクエリで作り直す）
+        if version == self._version + 1:
+            self._version = version
+
+    def add(self, rows: Iterable[Row], version: int):
+        """登録した取引を日付順の位置に挿入する（未作成・既に持っている取引は何もしない）
+
+        version はその書き込みで進めた台帳バージョン。
+        services はコミットの後に呼ぶため、その間に別のリクエストが作り直していれば
+        スナップショットは既にその取引を含んでいる（二重に数えないよう、IDで除く）。
+        """
+        with self._lock:
+            self._advance(version)
+            self._add(rows)
+
+    def remove(self, transaction_id: int, version: int):
+        """削除した取引を取り除く（未作成・見つからない場合は何もしない）"""
+        with self._lock:
+            self._advance(version)
+            self._remove(transaction_id)
+
+    def replace(self, row: Row, version: int):
+        """更新した取引を入れ替える"""
+        with self._lock:
+            self._advance(version)
+            self._remove(row[0])
+            self._add([row])
+
+    def _add(self, rows: Iterable[Row]):
+        with self._lock:
+            if self._built_at is None:
+                return
+            rows = sorted(
+                (row for row in rows if not self._has_id(row[0])), key=itemgetter(1)
+            )
+            if not rows:
+                return
+            new_ids = sorted(row[0] for row in rows)
+            if self._sorted_ids and new_ids[0] < self._sorted_ids[-1]:
+                self._sorted_ids = array("q", sorted([*self._sorted_ids, *new_ids]))
+            else:
+                # 通常は新しいIDなので末尾に追加するだけ
+                self._sorted_ids.extend(new_ids)
+            batch = _empty_columns()
+            self._extend(batch, rows)
+            dates = self._columns["dates"]
+            positions = [bisect_right(dates, ordinal) for ordinal in batch["dates"]]
+            if positions[0] == len(dates):
+                # 既存のどの行よりも新しい日付（通常の登録）は末尾に追加する
+                for name, column in self._columns.items():
+                    column.extend(batch[name])
+                return
+            # 列ごとに、既存の区間と新しい行を交互につなげる（既存の行のコピーは1回）
+            for name, column in self._columns.items():
+                merged = array(column.typecode)
+                start = 0
+                for index, position in enumerate(positions):
+                    merged.extend(column[start:position])
+                    merged.append(batch[name][index])
+                    start = position
+                merged.extend(column[start:])
+                self._columns[name] = merged
+
+    def _remove(self, transaction_id: int):
+        with self._lock:
+            if self._built_at is None:
+                return
+            if not self._has_id(transaction_id):
+                return
+            del self._sorted_ids[bisect_left(self._sorted_ids, transaction_id)]
+            position = self._columns["ids"].index(transaction_id)
+            for column in self._columns.values():
+                del column[position]
+
+    def _has_id(self, transaction_id: int) -> bool:
+        ids = self._sorted_ids
+        position = bisect_left(ids, transaction_id)
+        return position < len(ids) and ids[position] == transaction_id
+
+    def _extend(self, columns: dict, rows):
+        # 列ごとにまとめて変換・追加する（新しいカテゴリ・内容には先にコードを割り当てる）
+        rows = list(rows)
+        if not rows:
+            return
+        ids, dates, amounts, category_ids, types, kinds, contents = zip(*rows)
+        for category_id in set(category_ids).difference(self._category_codes):
+            if len(self._category_ids) >= MAX_CATEGORIES:
+                raise ValueError("Too many categories for the analytics snapshot")
+            self._category_codes[category_id] = len(self._category_ids)
+            self._category_ids.append(category_id)
+        for content in set(contents).difference(self._payee_codes):
+            self._payee_codes[content] = len(self._payees)
+            self._payees.append(content)
+        columns["ids"].extend(ids)
+        columns["dates"].extend(map(date.toordinal, dates))
+        columns["amounts"].extend(amounts)
+        columns["categories"].extend(
+            map(self._category_codes.__getitem__, category_ids)
+        )
+        columns["flags"].extend(
+            map(
+                or_,
+                map(TYPE_FLAGS.get, types, repeat(0)),
+                map(TRANSACTION_TYPE_FLAGS.get, kinds, repeat(0)),
+            )
+        )
+        columns["payees"].extend(map(self._payee_codes.__getitem__, contents))
+
+    # --- クエリ ---
+
+    def _bounds(self, date_from: Optional[date], date_to: Optional[date]):
+        dates = self._columns["dates"]
+        lo = 0 if date_from is None else bisect_left(dates, date_from.toordinal())
+        hi = len(dates) if date_to is None else bisect_right(dates, date_to.toordinal())
+        return lo, max(lo, hi)
+
+    def _selector(
+        self, lo: int, hi: int, mask: int, category_id: Optional[int] = None
+    ) -> bytes:
+        """[lo, hi) の各行について、flags に mask のビットがすべて立ち、カテゴリが一致すれば1のバイト列"""
+        selector = self._columns["flags"][lo:hi].tobytes().translate(_mask_table(mask))
+        if category_id is not None:
+            code = self._category_codes.get(category_id)
+            matches = self._columns["categories"][lo:hi].tobytes()
+            selector = _and(selector, matches.translate(_code_table(code)))
+        return selector
+
+    def _masks(self, transaction_type: Optional[str]):
+        kind = TRANSACTION_TYPE_FLAGS.get(transaction_type, 0)
+        return INCOME | kind, EXPENSE | kind
+
+    def totals(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        category_id: Optional[int] = None,
+        transaction_type: Optional[str] = None,
+    ) -> dict:
+        """期間の収入・支出の合計と件数"""
+        result = {"count": 0}
+        with self._lock:
+            lo, hi = self._bounds(date_from, date_to)
+            amounts = self._columns["amounts"][lo:hi]
+            income_mask, expense_mask = self._masks(transaction_type)
+            for key, mask in (("income", income_mask), ("expense", expense_mask)):
+                selector = self._selector(lo, hi, mask, category_id)
+                result[key] = sum(compress(amounts, selector))
+                result["count"] += selector.count(1)
+        return result
+
+    def breakdown(
+        self,
+        group_by: str,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        transaction_type: Optional[str] = None,
+    ) -> List[Tuple[object, int, int]]:
+        """月別（"YYYY-MM"）・年別（"YYYY"）・カテゴリ別（カテゴリID）の (キー, 収入, 支出)
+
+        月別・年別は日付順の列を期間ごとの区間に分け、収支タイプのセレクタの同じ区間で選んで合計する。
+        カテゴリ別は収支タイプで選んだ後、カテゴリのコードのセレクタで選んで合計する。
+        """
+        totals = defaultdict(lambda: [0, 0, 0])
+        with self._lock:
+            lo, hi = self._bounds(date_from, date_to)
+            amounts = self._columns["amounts"][lo:hi]
+            if group_by != "category":
+                periods = list(_periods(self._columns["dates"], group_by, lo, hi))
+            for index, mask in enumerate(self._masks(transaction_type)):
+                selector = self._selector(lo, hi, mask)
+                if group_by == "category":
+                    # 収支タイプで選んだ行を、カテゴリごとのセレクタでさらに選ぶ
+                    # （何度も走査するので、要素を int に変換済みの list にしておく）
+                    selected = list(compress(amounts, selector))
+                    codes = bytes(
+                        compress(self._columns["categories"][lo:hi], selector)
+                    )
+                    for code, category_id in enumerate(self._category_ids):
+                        match = codes.translate(_code_table(code))
+                        total = totals[category_id]
+                        total[index] += sum(compress(selected, match))
+                        total[2] += match.count(1)
+                else:
+                    for key, start, end in periods:
+                        match = selector[start - lo : end - lo]
+                        total = totals[key]
+                        total[index] += sum(
+                            compress(amounts[start - lo : end - lo], match)
+                        )
+                        total[2] += match.count(1)
+        return [
+            (key, income, expense)
+            for key, (income, expense, count) in sorted(totals.items())
+            if count
+        ]
+
+    def top_payees(
+        self,
+        limit: int = 10,
+        type: str = "expense",
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        category_id: Optional[int] = None,
+        transaction_type: Optional[str] = None,
+    ) -> List[Tuple[str, int, int]]:
+        """金額の合計が大きい順の (内容, 合計, 件数)"""
+        income_mask, expense_mask = self._masks(transaction_type)
+        mask = income_mask if type == "income" else expense_mask
+        with self._lock:
+            lo, hi = self._bounds(date_from, date_to)
+            selector = self._selector(lo, hi, mask, category_id)
+            payees = list(compress(self._columns["payees"][lo:hi], selector))
+            amounts = compress(self._columns["amounts"][lo:hi], selector)
+            names = self._payees
+        counts = Counter(payees)
+        totals = defaultdict(int)
+        for payee, amount in zip(payees, amounts):
+            totals[payee] += amount
+        top = nlargest(limit, totals.items(), key=itemgetter(1))
+        return [(names[payee], amount, counts[payee]) for payee, amount in top]
+
+    def stats(self) -> dict:
+        """行数・作成からの経過秒数・メモリ使用量（バイト）"""
+        with self._lock:
+            columns = {
+                name: len(column) * column.itemsize
+                for name, column in self._columns.items()
+            }
+            columns["id_index"] = len(self._sorted_ids) * self._sorted_ids.itemsize
+            payee_bytes = (
+                sys.getsizeof(self._payees)
+                + sys.getsizeof(self._payee_codes)
+                + sum(map(sys.getsizeof, self._payees))
+            )
+            category_bytes = sys.getsizeof(self._category_ids) + sys.getsizeof(
+                self._category_codes
+            )
+            return {
+                "rows": len(self._columns["ids"]),
+                "built": self._built_at is not None,
+                "age_seconds": (
+                    None
+                    if self._built_at is None
+                    else time.monotonic() - self._built_at
+                ),
+                "memory": {
+                    **columns,
+                    "payee_dictionary": payee_bytes,
+                    "category_dictionary": category_bytes,
+                },
+                "memory_total": sum(columns.values()) + payee_bytes + category_bytes,
+            }
+
+
+ledger_snapshot = LedgerSnapshot()
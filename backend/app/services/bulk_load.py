@@ -0,0 +1,244 @@
+"""
+取引をHTTP・ORMを通さずに一括でデータベースへ書き込む（finance の直接取り込みモードで使う）。
+
+行はまず一時テーブルに送る（PostgreSQL は COPY、それ以外は executemany）。その後、
+1つのDBトランザクションの中で、登録済みの指紋と同じ取り込み内で重複する指紋の行を除き、
+INSERT ... SELECT で transactions に登録して、集計テーブルと検索インデックスにも同じ行を反映し、
+台帳のバージョンを進める。
+検証は一括登録APIと同じ TransactionCreate で行い、不正な行は登録せずに返す。
+"""
+
+import io
+import logging
+from typing import Iterable, List, Mapping, Tuple
+
+from models.transaction import Transaction
+from pydantic import ValidationError
+from schemas.transaction import TransactionCreate, format_validation_error
+from services.analytics import ledger_snapshot
+from services.category_cache import category_cache
+from services.ledger_version import bump_ledger_version
+from services.monthly_totals import build_aggregate_statement, build_upsert_statement
+from services.search_index import fill_search_index
+from sqlalchemy import (
+    Column,
+    Date,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    delete,
+    exists,
+    func,
+    insert,
+    select,
+    text,
+    true,
+)
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+
+logger = logging.getLogger(__name__)
+
+# 一時テーブルへ一度に送る行数
+LOAD_CHUNK_SIZE = 50_000
+
+# 一時テーブルの列（position は取り込み内の位置。重複の判定と登録順に使う）
+STAGING_COLUMNS = (
+    "position",
+    "date",
+    "amount",
+    "content",
+    "type",
+    "category_id",
+    "source",
+    "transaction_type",
+    "fingerprint",
+)
+
+staging_metadata = MetaData()
+staging_table = Table(
+    "transactions_staging",
+    staging_metadata,
+    Column("position", Integer, nullable=False),
+    Column("date", Date, nullable=False),
+    Column("amount", Integer, nullable=False),
+    Column("content", String, nullable=False),
+    Column("type", String, nullable=False),
+    Column("category_id", Integer, nullable=False),
+    Column("source", String),
+    Column("transaction_type", String),
+    Column("fingerprint", String(64)),
+    prefixes=["TEMPORARY"],
+)
+# テーブルとは別に、行を送り終えた後に作る（送る間はインデックスを更新しない）
+staging_fingerprint_index = Index(
+    "ix_transactions_staging_fingerprint", staging_table.c.fingerprint
+)
+
+
+def validate_row(position: int, item: Mapping, category_ids) -> tuple:
+    """一括登録APIと同じく TransactionCreate で検証し、一時テーブルの行にする（不正な値は ValueError）"""
+    try:
+        transaction = TransactionCreate.model_validate(item)
+    except ValidationError as e:
+        raise ValueError(format_validation_error(e))
+    category_id = category_ids.get(transaction.category)
+    if category_id is None:
+        raise ValueError(f"Unknown category: {transaction.category}")
+    return (
+        position,
+        transaction.date,
+        transaction.amount,
+        transaction.content,
+        transaction.type,
+        category_id,
+        transaction.source,
+        transaction.transaction_type,
+        transaction.fingerprint,
+    )
+
+
+def _copy_value(value) -> str:
+    # COPY のテキスト形式: NULL は \N、区切り・改行・バックスラッシュはエスケープする
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_rows(db: Session, rows: List[tuple]):
+    # PostgreSQL（psycopg2）は COPY ... FROM STDIN で送る
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(map(_copy_value, row)))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {staging_table.name} ({', '.join(STAGING_COLUMNS)}) FROM STDIN",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def _executemany_rows(db: Session, rows: List[tuple]):
+    placeholders = ", ".join("?" for _ in STAGING_COLUMNS)
+    db.connection().exec_driver_sql(
+        f"INSERT INTO {staging_table.name} ({', '.join(STAGING_COLUMNS)}) "
+        f"VALUES ({placeholders})",
+        # SQLite の Date 型と同じく ISO 形式の文字列で保存する
+        [(row[0], row[1].isoformat(), *row[2:]) for row in rows],
+    )
+
+
+def _insert_rows(db: Session, rows: List[tuple]):
+    db.execute(insert(staging_table), [dict(zip(STAGING_COLUMNS, row)) for row in rows])
+
+
+def _row_writer(db: Session):
+    dialect = db.get_bind().dialect
+    if dialect.name == "postgresql" and dialect.driver == "psycopg2":
+        return _copy_rows
+    if dialect.name == "sqlite":
+        return _executemany_rows
+    return _insert_rows
+
+
+def _drop_duplicates(db: Session):
+    # 登録済みの指紋の行と、同じ取り込み内で先に現れた指紋と同じ行を除く
+    staged = staging_table.c
+    db.execute(
+        delete(staging_table).where(
+            exists().where(Transaction.fingerprint == staged.fingerprint)
+        )
+    )
+    earlier = staging_table.alias("earlier")
+    db.execute(
+        delete(staging_table).where(
+            exists().where(
+                earlier.c.fingerprint == staged.fingerprint,
+                earlier.c.position < staged.position,
+            )
+        )
+    )
+
+
+def load_transactions(
+    db: Session, items: Iterable[Mapping], chunk_size: int = LOAD_CHUNK_SIZE
+) -> Tuple[int, int, List[Tuple[int, str]]]:
+    """取引（TransactionCreate と同じキーの辞書）を1つのDBトランザクションで一括登録する
+
+    (登録件数, 指紋が登録済み・重複のためスキップした件数, [(位置, エラー内容)]) を返す。
+    """
+    errors = []
+    try:
+        category_cache.load(db)
+        category_ids = category_cache.ids_by_name()
+        dialect_name = db.get_bind().dialect.name
+        db.execute(CreateTable(staging_table))
+        write_rows = _row_writer(db)
+
+        staged = 0
+        rows = []
+        for position, item in enumerate(items):
+            try:
+                rows.append(validate_row(position, item, category_ids))
+            except ValueError as e:
+                errors.append((position, str(e)))
+                continue
+            if len(rows) >= chunk_size:
+                write_rows(db, rows)
+                staged += len(rows)
+                rows = []
+        if rows:
+            write_rows(db, rows)
+            staged += len(rows)
+
+        staging_fingerprint_index.create(db.connection())
+        if dialect_name == "postgresql":
+            # 確認から登録までの間に他の書き込みで指紋が登録されないようにする（読み込みは止めない）
+            # SQLite では読み込んだ後に他の書き込みがあれば、登録時にエラーになる
+            db.execute(text("LOCK TABLE transactions IN SHARE ROW EXCLUSIVE MODE"))
+        _drop_duplicates(db)
+        inserted = db.scalar(select(func.count()).select_from(staging_table))
+        # 登録前の最大のID（他の書き込みは上のロック・SQLite の書き込みの競合で入らないため、
+        # これより大きいIDの行がこの取り込みで登録した行になる）
+        last_id = db.scalar(select(func.max(Transaction.id)))
+
+        columns = [name for name in STAGING_COLUMNS if name != "position"]
+        db.execute(
+            insert(Transaction).from_select(
+                columns,
+                select(*[staging_table.c[name] for name in columns]).order_by(
+                    staging_table.c.position
+                ),
+            )
+        )
+        db.execute(
+            build_upsert_statement(
+                dialect_name,
+                build_aggregate_statement(dialect_name, staging_table).where(true()),
+            )
+        )
+        fill_search_index(db.connection(), after_id=last_id or 0)
+        staging_table.drop(db.connection())
+        # 実行中のAPIプロセスのレスポンスキャッシュも、DBの台帳バージョンで古くなったと分かる
+        bump_ledger_version(db)
+        db.commit()
+        ledger_snapshot.invalidate()
+        return inserted, staged - inserted, errors
+
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error occurred while loading transactions: {e}")
+        raise
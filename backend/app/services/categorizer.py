@@ -0,0 +1,124 @@
+"""
+取引の内容（支払先）からカテゴリを判定するルールエンジン。
+
+ルールはJSONファイルで編集する。各ルールは次のキーを持つ。
+
+    {"match": "contains", "pattern": "セブンイレブン", "category": "食費", "type": "expense"}
+
+- match: exact（完全一致）、prefix（前方一致）、contains（部分一致）、regex（正規表現）
+- type: ルールを適用する収支タイプ（省略時は expense）
+
+内容とパターンは NFKC 正規化・casefold してから比較する（全角・半角、大文字・小文字を区別しない）。
+exact は辞書で引き、それ以外のルールは収支タイプごとに1つの正規表現にまとめて1回で照合する。
+exact が優先され、それ以外はファイル内で先に書かれたルールが優先される。
+regex ルールではグループの後方参照・名前付きグループは使えない。
+
+このモジュールは標準ライブラリだけに依存する（finance の取り込みからも読み込む）。
+"""
+
+import json
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+MATCH_TYPES = ("exact", "prefix", "contains", "regex")
+
+# 判定結果をメモする件数の上限（同じ支払先が繰り返し現れるため）
+MEMO_MAX_ENTRIES = 65536
+
+
+def normalize_payee(value: str) -> str:
+    return unicodedata.normalize("NFKC", value).casefold()
+
+
+class Categorizer:
+    def __init__(self, rules: List[dict]):
+        self.rules = rules
+        self._exact: Dict[tuple, str] = {}
+        self._categories: Dict[str, str] = {}  # グループ名 -> カテゴリ
+        self._memo: Dict[tuple, Optional[str]] = {}
+        alternatives = defaultdict(list)
+
+        for index, rule in enumerate(rules):
+            match = rule.get("match", "contains")
+            rule_type = rule.get("type", "expense")
+            pattern = rule["pattern"]
+            if match == "exact":
+                self._exact.setdefault(
+                    (rule_type, normalize_payee(pattern)), rule["category"]
+                )
+                continue
+            if match == "prefix":
+                body = re.escape(normalize_payee(pattern))
+            elif match == "contains":
+                body = ".*?" + re.escape(normalize_payee(pattern))
+            elif match == "regex":
+                try:
+                    re.compile(pattern)
+                except re.error as e:
+                    raise ValueError(f"Invalid regex in rule {index}: {e}")
+                body = f".*?(?:{pattern})"
+            else:
+                raise ValueError(f"Unknown match type in rule {index}: {match}")
+
+            # 先頭位置の先読みを並べ、最初に成立したルールの空グループ名で判定する
+            group = f"r{index}"
+            alternatives[rule_type].append(f"(?={body})(?P<{group}>)")
+            self._categories[group] = rule["category"]
+
+        self._automata = {
+            rule_type: re.compile("|".join(patterns), re.IGNORECASE | re.DOTALL)
+            for rule_type, patterns in alternatives.items()
+        }
+
+    def categories(self) -> set:
+        return {rule["category"] for rule in self.rules}
+
+    def categorize(self, content: str, type: str = "expense") -> Optional[str]:
+        """一致したルールのカテゴリを返す（一致しなければ None）"""
+        key = (type, content)
+        if key in self._memo:
+            return self._memo[key]
+        if len(self._memo) >= MEMO_MAX_ENTRIES:
+            self._memo.clear()
+        category = self._memo[key] = self._match(content, type)
+        return category
+
+    def _match(self, content: str, type: str) -> Optional[str]:
+        normalized = normalize_payee(content)
+        category = self._exact.get((type, normalized))
+        if category is not None:
+            return category
+        automaton = self._automata.get(type)
+        if automaton is None:
+            return None
+        matched = automaton.match(normalized)
+        return self._categories[matched.lastgroup] if matched else None
+
+
+def load_rules(path) -> List[dict]:
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return []
+
+
+# ファイルの更新時刻が変わるまで、コンパイル済みのルールを使い回す
+_loaded: Dict[str, tuple] = {}
+
+
+def load_categorizer(path) -> Categorizer:
+    path = str(Path(path))
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, Categorizer(load_rules(path)))
+        _loaded[path] = cached
+    return cached[1]
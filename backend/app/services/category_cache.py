@@ -0,0 +1,48 @@
+import threading
+from typing import Dict, Iterable, Optional
+
+from models.transaction import Category
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+
+# カテゴリの名前・ID・色のプロセス内キャッシュ
+# カテゴリは seeds/category.py で投入され実行中は変わらないため、起動時に読み込み、
+# 見つからない名前・IDが来たときだけDBから読み直す
+class CategoryCache:
+    def __init__(self):
+        self._ids_by_name: Dict[str, int] = {}
+        self._names_by_id: Dict[int, str] = {}
+        self._colors_by_id: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    # 非同期セッションからは AsyncSession.run_sync(category_cache.load) で呼ぶ
+    def load(self, db: Session):
+        rows = db.execute(select(Category.id, Category.name, Category.color)).all()
+        with self._lock:
+            self._ids_by_name = {name: category_id for category_id, name, _ in rows}
+            self._names_by_id = {category_id: name for category_id, name, _ in rows}
+            self._colors_by_id = {category_id: color for category_id, _, color in rows}
+
+    def get_id(self, name: str) -> Optional[int]:
+        return self._ids_by_name.get(name)
+
+    def get_name(self, category_id: int) -> Optional[str]:
+        return self._names_by_id.get(category_id)
+
+    def get_color(self, category_id: int) -> Optional[str]:
+        return self._colors_by_id.get(category_id)
+
+    def ids_by_name(self) -> Dict[str, int]:
+        return self._ids_by_name
+
+    def has_ids(self, category_ids: Iterable[int]) -> bool:
+        names_by_id = self._names_by_id
+        return all(category_id in names_by_id for category_id in category_ids)
+
+    def has_names(self, names: Iterable[str]) -> bool:
+        ids_by_name = self._ids_by_name
+        return all(name in ids_by_name for name in names)
+
+
+category_cache = CategoryCache()
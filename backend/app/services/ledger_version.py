@@ -0,0 +1,37 @@
+"""
+台帳のバージョン（ledger_state テーブルの1行）。
+
+取引を書き込むDBトランザクションの中で build_bump_statement を実行して1つ進め（進めた後の値を返す）、
+読み込み系APIと分析用のスナップショットはリクエストごとに build_version_statement で読む（主キーでの1行の読み込み）。
+行がなければバージョンは 0 とし、最初の書き込みで作る。
+"""
+
+from core.database import dialect_insert
+from models.transaction import LedgerState
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+LEDGER_STATE_ID = 1
+
+
+def build_version_statement():
+    return select(LedgerState.version).where(LedgerState.id == LEDGER_STATE_ID)
+
+
+def build_bump_statement(dialect_name: str):
+    # 行がなければ version=1 で作り、あれば 1 つ進める（進めた後の値を返す）
+    statement = dialect_insert(dialect_name)(LedgerState).values(
+        id=LEDGER_STATE_ID, version=1
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[LedgerState.id],
+        set_={"version": LedgerState.version + 1},
+    ).returning(LedgerState.version)
+
+
+def get_ledger_version(db: Session) -> int:
+    return db.scalar(build_version_statement()) or 0
+
+
+def bump_ledger_version(db: Session) -> int:
+    return db.scalar(build_bump_statement(db.get_bind().dialect.name))
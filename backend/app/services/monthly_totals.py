@@ -0,0 +1,171 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.database import dialect_insert
+from models.transaction import Category, MonthlyCategoryTotal, Transaction
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+# 集計テーブルへの差分: (日付, カテゴリID, 収支タイプ, 金額, 符号)
+# 符号は登録時 +1、削除時 -1。更新は旧値の -1 と新値の +1 の組み合わせ
+Entry = Tuple[date, int, str, int, int]
+
+
+def month_of(value: date) -> str:
+    # strftime より速い（一括登録・一括更新では行数分呼ばれる）
+    return value.isoformat()[:7]
+
+
+# 差分を (月, カテゴリ) ごとにまとめ、UPSERT のパラメータにする
+def collect_deltas(entries: Iterable[Entry]) -> List[dict]:
+    totals = defaultdict(lambda: [0, 0, 0])
+    for entry_date, category_id, entry_type, amount, sign in entries:
+        total = totals[(month_of(entry_date), category_id)]
+        if entry_type == "income":
+            total[0] += sign * amount
+        else:
+            total[1] += sign * amount
+        total[2] += sign
+    return _delta_rows(totals)
+
+
+# カテゴリの付け替えを差分にする
+# moves は (月, 収支タイプ, 旧カテゴリID, 新カテゴリID) -> [金額の合計, 件数]
+def collect_move_deltas(moves: Dict[tuple, list]) -> List[dict]:
+    totals = defaultdict(lambda: [0, 0, 0])
+    for (month, entry_type, old_id, new_id), (amount, count) in moves.items():
+        for category_id, sign in ((old_id, -1), (new_id, 1)):
+            total = totals[(month, category_id)]
+            total[0 if entry_type == "income" else 1] += sign * amount
+            total[2] += sign * count
+    return _delta_rows(totals)
+
+
+def _delta_rows(totals: dict) -> List[dict]:
+    return [
+        {
+            "month": month,
+            "category_id": category_id,
+            "income": income,
+            "expense": expense,
+            "transaction_count": count,
+        }
+        for (month, category_id), (income, expense, count) in totals.items()
+    ]
+
+
+# 既存の行には差分を加算する INSERT ... ON CONFLICT DO UPDATE
+# aggregated を渡すと、その SELECT の結果（月・カテゴリID・収入・支出・件数）を差分にする
+def build_upsert_statement(dialect_name: str, aggregated=None):
+    statement = dialect_insert(dialect_name)(MonthlyCategoryTotal)
+    table = MonthlyCategoryTotal.__table__
+    if aggregated is not None:
+        statement = statement.from_select(
+            [
+                table.c.month,
+                table.c.category_id,
+                table.c.income,
+                table.c.expense,
+                table.c.transaction_count,
+            ],
+            aggregated,
+        )
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.month, table.c.category_id],
+        set_={
+            "income": table.c.income + statement.excluded.income,
+            "expense": table.c.expense + statement.excluded.expense,
+            "transaction_count": table.c.transaction_count
+            + statement.excluded.transaction_count,
+        },
+    )
+
+
+def apply_monthly_deltas(db: Session, entries: Iterable[Entry]):
+    _apply_deltas(db, collect_deltas(entries))
+
+
+def apply_category_moves(db: Session, moves: Dict[tuple, list]):
+    _apply_deltas(db, collect_move_deltas(moves))
+
+
+def _apply_deltas(db: Session, deltas: List[dict]):
+    if deltas:
+        db.execute(build_upsert_statement(db.get_bind().dialect.name), deltas)
+
+
+# 取引の表（transactions、または同じ列を持つ一時テーブル）を月・カテゴリごとに集計する文
+def build_aggregate_statement(dialect_name: str, table=None):
+    columns = (Transaction.__table__ if table is None else table).c
+    if dialect_name == "postgresql":
+        month = func.to_char(columns.date, "YYYY-MM")
+    else:
+        month = func.strftime("%Y-%m", columns.date)
+    return select(
+        month,
+        columns.category_id,
+        func.sum(case((columns.type == "income", columns.amount), else_=0)),
+        func.sum(case((columns.type == "income", 0), else_=columns.amount)),
+        func.count(),
+    ).group_by(month, columns.category_id)
+
+
+# transactions から集計テーブルを作り直す文（削除 → INSERT ... SELECT）
+def build_rebuild_statements(dialect_name: str):
+    aggregated = build_aggregate_statement(dialect_name)
+    table = MonthlyCategoryTotal.__table__
+    return [
+        delete(MonthlyCategoryTotal),
+        insert(MonthlyCategoryTotal).from_select(
+            [
+                table.c.month,
+                table.c.category_id,
+                table.c.income,
+                table.c.expense,
+                table.c.transaction_count,
+            ],
+            aggregated,
+        ),
+    ]
+
+
+def rebuild_monthly_category_totals(db: Session):
+    for statement in build_rebuild_statements(db.get_bind().dialect.name):
+        db.execute(statement)
+    db.commit()
+
+
+# 期間が月単位（月初〜月末）の場合は集計テーブルから読める
+def is_month_aligned(date_from: Optional[date], date_to: Optional[date]) -> bool:
+    if date_from is not None and date_from.day != 1:
+        return False
+    if date_to is not None and (date_to + timedelta(days=1)).day != 1:
+        return False
+    return True
+
+
+# 集計テーブルから月別またはカテゴリ別の収支を読む文
+def build_rollup_summary_statement(
+    group_by: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    if group_by == "month":
+        key = MonthlyCategoryTotal.month
+    else:
+        key = Category.name
+    statement = select(
+        key.label("key"),
+        func.sum(MonthlyCategoryTotal.income).label("income"),
+        func.sum(MonthlyCategoryTotal.expense).label("expense"),
+    ).where(MonthlyCategoryTotal.transaction_count > 0)
+    if group_by == "category":
+        statement = statement.join(
+            Category, MonthlyCategoryTotal.category_id == Category.id
+        )
+    if date_from is not None:
+        statement = statement.where(MonthlyCategoryTotal.month >= month_of(date_from))
+    if date_to is not None:
+        statement = statement.where(MonthlyCategoryTotal.month <= month_of(date_to))
+    return statement.group_by(key).order_by(key)
@@ -0,0 +1,226 @@
+"""
+取引の内容（支払先）の全文検索インデックス。
+
+transaction_search に、内容を normalize_search_text で正規化した文字列を取引ごとに持つ。
+
+- SQLite: FTS5 の仮想テーブル（trigram トークナイザ）。rowid は search_key（日付とID）
+- PostgreSQL: 通常のテーブルと pg_trgm の GIN インデックス。transaction_id が取引のID
+
+検索語も同じく正規化し、内容に含む取引を新しい順に探す（部分一致）。SQLite では rowid の順が
+(日付, ID) の順になるため、FTS5 を rowid の逆順に読み、limit 件そろった時点で止められる。
+trigram は3文字未満の語をインデックスで探せないため、その場合は新しい行から順に内容を調べる。
+
+インデックスは transactions への書き込み（services/transaction.py・transaction_async.py・bulk_load.py）と
+同じDBトランザクションで更新する。直接DBを編集した場合は作り直す（python -m commands.rebuild_search_index）。
+"""
+
+import unicodedata
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+from models.transaction import Transaction
+from sqlalchemy import (
+    BigInteger,
+    Integer,
+    String,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    inspect,
+    select,
+    table,
+)
+from sqlalchemy.orm import Session
+
+SEARCH_TABLE = "transaction_search"
+
+# SQLite の trigram でインデックスを使える検索語の最短の長さ
+MIN_INDEXED_LENGTH = 3
+
+# SQLite の rowid の下位ビットに詰める取引のIDのビット数
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+
+# SQLite の julianday から date.toordinal を求めるための差（序数1の 0001-01-01 がユリウス日 1721425.5）
+JULIAN_DAY_OFFSET = 1721424.5
+
+# インデックスの作成時に transactions から一度に読み込む行数
+FILL_CHUNK_SIZE = 50_000
+
+# 正規化の結果をメモする件数の上限（同じ支払先が繰り返し現れるため）
+NORMALIZE_CACHE_SIZE = 65536
+
+# 方言ごとのインデックスの作成文（繰り返し実行しても同じ結果）
+# マイグレーション 0005 は作成時点の文と正規化を固定して持つため、変える場合は新しいマイグレーションを加える
+SEARCH_INDEX_DDL = {
+    "sqlite": [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+        "USING fts5(content, tokenize='trigram')",
+    ],
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} "
+        "(transaction_id integer PRIMARY KEY, content text NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_content "
+        f"ON {SEARCH_TABLE} USING gin (content gin_trgm_ops)",
+    ],
+}
+
+# 検索インデックスに加える行: (ID, 日付, 内容)、除く行: (ID, 日付)
+IndexRow = Tuple[int, date, str]
+IndexKey = Tuple[int, date]
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_search_text(value: str) -> str:
+    """finance の convert_string と同じ正規化（半角ハイフンを長音に、NFKC）に casefold を加える"""
+    return unicodedata.normalize("NFKC", value.replace("-", "ｰ")).casefold()
+
+
+def search_key(transaction_date: date, transaction_id: int) -> int:
+    """SQLite のインデックスの rowid（日付の序数を上位、IDを下位 ID_BITS ビットに詰める）"""
+    return transaction_date.toordinal() << ID_BITS | transaction_id
+
+
+# ON CONFLICT と同じく、PostgreSQL 以外は SQLite として扱う
+def _is_postgresql(dialect_name: str) -> bool:
+    return dialect_name == "postgresql"
+
+
+# (インデックスのテーブル, キーの列)
+def _search_table(dialect_name: str):
+    key = "transaction_id" if _is_postgresql(dialect_name) else "rowid"
+    search = table(SEARCH_TABLE, column(key, BigInteger), column("content", String))
+    return search, search.c[key]
+
+
+def _key(dialect_name: str, transaction_id: int, transaction_date) -> int:
+    if _is_postgresql(dialect_name):
+        return transaction_id
+    return search_key(transaction_date, transaction_id)
+
+
+def _index_rows(dialect_name: str, rows: Iterable[IndexRow]) -> List[dict]:
+    _, key = _search_table(dialect_name)
+    return [
+        {
+            key.name: _key(dialect_name, transaction_id, transaction_date),
+            "content": normalize_search_text(content),
+        }
+        for transaction_id, transaction_date, content in rows
+    ]
+
+
+def build_index_statements(
+    dialect_name: str,
+    added: Iterable[IndexRow] = (),
+    removed: Iterable[IndexKey] = (),
+) -> list:
+    """インデックスから removed の行を除き、added の行を加える (文, パラメータ) のリスト"""
+    search, key = _search_table(dialect_name)
+    statements = []
+    keys = [_key(dialect_name, *row) for row in removed]
+    if keys:
+        statements.append((delete(search).where(key.in_(keys)), None))
+    rows = _index_rows(dialect_name, added)
+    if rows:
+        statements.append((insert(search), rows))
+    return statements
+
+
+def update_search_index(
+    db: Session, added: Iterable[IndexRow] = (), removed: Iterable[IndexKey] = ()
+):
+    dialect_name = db.get_bind().dialect.name
+    for statement, parameters in build_index_statements(dialect_name, added, removed):
+        db.execute(statement, parameters)
+
+
+def apply_search(
+    statement,
+    dialect_name: str,
+    query: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    """取引の SELECT 文を、内容に query を含む取引に絞り、新しい順に並べる"""
+    search, key = _search_table(dialect_name)
+    normalized = normalize_search_text(query)
+    if _is_postgresql(dialect_name):
+        # pg_trgm の GIN インデックスは LIKE '%...%' に使える（並べ方はプランナーに任せる）
+        matched = search.c.content.contains(normalized, autoescape=True)
+        return (
+            statement.where(Transaction.id.in_(select(key).where(matched)))
+            .order_by(None)
+            .order_by(Transaction.date.desc(), Transaction.id.desc())
+        )
+
+    if len(normalized) >= MIN_INDEXED_LENGTH:
+        # 検索語全体を1つのフレーズとして探す（" は2つ重ねてエスケープする）
+        matched = search.c.content.match('"' + normalized.replace('"', '""') + '"')
+    else:
+        matched = func.instr(search.c.content, normalized) > 0
+    statement = statement.join(search, Transaction.id == key.op("&")(ID_MASK)).where(
+        matched
+    )
+    # 期間は rowid の範囲としても指定し、FTS5 が読む範囲を狭める
+    if date_from is not None:
+        statement = statement.where(key >= search_key(date_from, 0))
+    if date_to is not None:
+        statement = statement.where(key < search_key(date_to + timedelta(days=1), 0))
+    return statement.order_by(None).order_by(key.desc())
+
+
+def search_index_exists(connection) -> bool:
+    return SEARCH_TABLE in inspect(connection).get_table_names()
+
+
+def fill_search_index(connection, after_id: Optional[int] = None):
+    """transactions の行（after_id を指定した場合はそれより大きいIDの行）をインデックスに登録する"""
+    dialect_name = connection.dialect.name
+    search, key = _search_table(dialect_name)
+    if _is_postgresql(dialect_name):
+        statement = select(
+            Transaction.id, Transaction.date, Transaction.content
+        ).execution_options(yield_per=FILL_CHUNK_SIZE)
+        if after_id is not None:
+            statement = statement.where(Transaction.id > after_id)
+        for rows in connection.execute(statement).partitions():
+            connection.execute(insert(search), _index_rows(dialect_name, rows))
+        return
+
+    # SQLite は正規化を SQL の関数として登録し、行を Python に読み込まずに1文で登録する
+    connection.connection.dbapi_connection.create_function(
+        "normalize_search_text", 1, normalize_search_text, deterministic=True
+    )
+    ordinal = cast(func.julianday(Transaction.date) - JULIAN_DAY_OFFSET, Integer)
+    rows = select(
+        ordinal.op("<<")(ID_BITS).op("|")(Transaction.id),
+        func.normalize_search_text(Transaction.content),
+    )
+    if after_id is not None:
+        rows = rows.where(Transaction.id > after_id)
+    connection.execute(insert(search).from_select([key, search.c.content], rows))
+
+
+def create_search_index(connection):
+    """インデックスを作成し、transactions の全件を登録する"""
+    dialect_key = "postgresql" if _is_postgresql(connection.dialect.name) else "sqlite"
+    for statement in SEARCH_INDEX_DDL[dialect_key]:
+        connection.exec_driver_sql(statement)
+    fill_search_index(connection)
+
+
+def drop_search_index(connection):
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+def rebuild_search_index(db: Session):
+    """インデックスを transactions から作り直す（行ごとに削除するより、削除して作る方が速い）"""
+    connection = db.connection()
+    drop_search_index(connection)
+    create_search_index(connection)
+    db.commit()
@@ -1,7 +1,26 @@
+import base64
+import binascii
 import logging  # ロギング用のインポート
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
+from core.database import dialect_insert
 from models.transaction import Category, Transaction
 from schemas.transaction import TransactionCreate
+from services.analytics import ledger_snapshot, snapshot_row
+from services.categorizer import Categorizer
+from services.category_cache import category_cache
+from services.ledger_version import bump_ledger_version
+from services.monthly_totals import (
+    apply_category_moves,
+    apply_monthly_deltas,
+    build_rollup_summary_statement,
+    is_month_aligned,
+    month_of,
+)
+from services.search_index import apply_search, update_search_index
+from sqlalchemy import Integer, and_, case, func, or_, select, type_coerce, update
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
@@ -9,15 +28,237 @@ from sqlalchemy.orm import Session
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 一括登録時に1回のINSERTで送る行数
+BULK_INSERT_BATCH_SIZE = 1000
 
-def get_transactions(db: Session):
+# エクスポート時にサーバーサイドカーソルから一度に取り出す行数
+EXPORT_CHUNK_SIZE = 1000
+
+
+# カーソルは (date, id) を "YYYY-MM-DD:id" としてURLセーフなBase64にしたもの
+def encode_cursor(transaction_date: date, transaction_id: int) -> str:
+    raw = f"{transaction_date.isoformat()}:{transaction_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date_part, id_part = raw.split(":", 1)
+        return date.fromisoformat(date_part), int(id_part)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+# 一覧取得のSELECT文を組み立てる（同期版・非同期版で共通）
+# カテゴリ名は category_cache から付けるため categories とは結合しない
+def build_transactions_statement(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    type: Optional[str] = None,
+    category_id: Optional[int] = None,
+    source: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+):
+    statement = select(Transaction)
+
+    # 絞り込み条件（日付は両端を含む）
+    if date_from is not None:
+        statement = statement.where(Transaction.date >= date_from)
+    if date_to is not None:
+        statement = statement.where(Transaction.date <= date_to)
+    if type is not None:
+        statement = statement.where(Transaction.type == type)
+    if category_id is not None:
+        statement = statement.where(Transaction.category_id == category_id)
+    if source is not None:
+        statement = statement.where(Transaction.source == source)
+
+    # キーセットページネーション: 直前のページの最後の (date, id) より後ろを取得
+    if cursor is not None:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        statement = statement.where(
+            or_(
+                Transaction.date > cursor_date,
+                and_(Transaction.date == cursor_date, Transaction.id > cursor_id),
+            )
+        )
+
+    statement = statement.order_by(Transaction.date, Transaction.id)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+
+# 内容（支払先）で検索するSELECT文を組み立てる（同期版・非同期版で共通）
+# 絞り込み条件は一覧と同じで、新しい順に limit 件を返す
+def build_search_statement(dialect_name: str, query: str, limit: int, **filters):
+    statement = apply_search(
+        build_transactions_statement(**filters),
+        dialect_name,
+        query,
+        filters.get("date_from"),
+        filters.get("date_to"),
+    )
+    return statement.limit(limit)
+
+
+# (Transaction, カテゴリ名) のリストを返す
+def get_transactions(db: Session, category: Optional[str] = None, **filters):
+    category_id = None if category is None else _resolve_category_id(db, category)
+    transactions = db.scalars(
+        build_transactions_statement(category_id=category_id, **filters)
+    ).all()
+    if not category_cache.has_ids(t.category_id for t in transactions):
+        category_cache.load(db)
+    return [(t, category_cache.get_name(t.category_id)) for t in transactions]
+
+
+# 内容に query を含む (Transaction, カテゴリ名) のリストを新しい順に返す
+def search_transactions(
+    db: Session, query: str, limit: int, category: Optional[str] = None, **filters
+):
+    category_id = None if category is None else _resolve_category_id(db, category)
+    transactions = db.scalars(
+        build_search_statement(
+            db.get_bind().dialect.name,
+            query,
+            limit,
+            category_id=category_id,
+            **filters,
+        )
+    ).all()
+    if not category_cache.has_ids(t.category_id for t in transactions):
+        category_cache.load(db)
+    return [(t, category_cache.get_name(t.category_id)) for t in transactions]
+
+
+# エクスポート用に取引をチャンク単位で返す
+# ORMオブジェクトを作らず、サーバーサイドカーソルから列の値だけを順に取り出す
+def iter_transaction_chunks(
+    db: Session,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[List[tuple]]:
+    statement = select(
+        Transaction.id,
+        Transaction.date,
+        Transaction.amount,
+        Transaction.content,
+        Transaction.type,
+        Category.name.label("category"),
+        Transaction.source,
+        Transaction.transaction_type,
+    ).join(Category, Transaction.category_id == Category.id)
+    if date_from is not None:
+        statement = statement.where(Transaction.date >= date_from)
+    if date_to is not None:
+        statement = statement.where(Transaction.date <= date_to)
+    statement = statement.order_by(Transaction.date, Transaction.id)
+
+    result = db.execute(
+        statement.execution_options(stream_results=True, yield_per=chunk_size)
+    )
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+# 月単位の集計キー ("YYYY-MM") を方言ごとに生成
+def _month_key(dialect_name: str):
+    if dialect_name == "postgresql":
+        return func.to_char(Transaction.date, "YYYY-MM")
+    return func.strftime("%Y-%m", Transaction.date)
+
+
+# 集計のSELECT文を組み立てる（同期版・非同期版で共通）
+def build_summary_statement(
+    dialect_name: str,
+    group_by: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    # 月単位の期間であれば、月別・カテゴリ別の集計テーブルから読む
+    if group_by in ("month", "category") and is_month_aligned(date_from, date_to):
+        return build_rollup_summary_statement(group_by, date_from, date_to)
+
+    if group_by == "day":
+        key = Transaction.date
+    elif group_by == "month":
+        key = _month_key(dialect_name)
+    elif group_by == "category":
+        key = Category.name
+    else:
+        raise ValueError(f"Invalid group_by: {group_by}")
+
+    income = func.coalesce(
+        func.sum(case((Transaction.type == "income", Transaction.amount), else_=0)), 0
+    )
+    expense = func.coalesce(
+        func.sum(case((Transaction.type == "expense", Transaction.amount), else_=0)), 0
+    )
+    statement = select(
+        key.label("key"), income.label("income"), expense.label("expense")
+    ).select_from(Transaction)
+    if group_by == "category":
+        statement = statement.join(Category, Transaction.category_id == Category.id)
+
+    if date_from is not None:
+        statement = statement.where(Transaction.date >= date_from)
+    if date_to is not None:
+        statement = statement.where(Transaction.date <= date_to)
+
+    return statement.group_by(key).order_by(key)
+
+
+def get_transaction_summary(
+    db: Session,
+    group_by: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    statement = build_summary_statement(
+        db.get_bind().dialect.name, group_by, date_from, date_to
+    )
+    return db.execute(statement).all()
+
+
+# 集計テーブルに反映する差分（services/monthly_totals.py の Entry）
+def monthly_entry(transaction, sign: int):
     return (
-        db.query(Transaction, Category.name)
-        .join(Category, Transaction.category == Category.id)
-        .all()
+        transaction.date,
+        transaction.category_id,
+        transaction.type,
+        int(transaction.amount),
+        sign,
     )
 
 
+def bulk_monthly_entries(rows: List[dict]):
+    return [
+        (row["date"], row["category_id"], row["type"], row["amount"], 1) for row in rows
+    ]
+
+
+def get_category_by_name(db: Session, name: str):
+    return db.query(Category).filter(Category.name == name).first()
+
+
+def _resolve_category_id(db: Session, name: str) -> int:
+    category_id = category_cache.get_id(name)
+    if category_id is None:
+        category_cache.load(db)
+        category_id = category_cache.get_id(name)
+    if category_id is None:
+        raise ValueError(f"Unknown category: {name}")
+    return category_id
+
+
 def create_transaction(db: Session, transaction: TransactionCreate):
     try:
         # Transactionオブジェクトの作成
@@ -26,17 +267,27 @@ def create_transaction(db: Session, transaction: TransactionCreate):
             amount=transaction.amount,
             content=transaction.content,
             type=transaction.type,
-            category=transaction.category,
+            category_id=_resolve_category_id(db, transaction.category),
             source=transaction.source,
             transaction_type=transaction.transaction_type,
+            fingerprint=transaction.fingerprint,
         )
 
         # データベースに追加
         db.add(db_transaction)
+        apply_monthly_deltas(db, [monthly_entry(db_transaction, 1)])
+        # 検索インデックスには ID が必要なため、先に INSERT を送る
+        db.flush()
+        update_search_index(
+            db,
+            added=[(db_transaction.id, db_transaction.date, db_transaction.content)],
+        )
+        version = bump_ledger_version(db)
         db.commit()  # コミットを試みる
 
         # データをリフレッシュ
         db.refresh(db_transaction)
+        ledger_snapshot.add([snapshot_row(db_transaction)], version)
         return db_transaction
 
     except SQLAlchemyError as e:  # SQLAlchemyのエラーを捕捉
@@ -53,21 +304,248 @@ def create_transaction(db: Session, transaction: TransactionCreate):
         raise  # エラーを再スロー
 
 
+def _get_category_ids(db: Session, names) -> Dict[str, int]:
+    if not category_cache.has_names(names):
+        category_cache.load(db)
+    return category_cache.ids_by_name()
+
+
+# 一括登録用の行データを作成する（同期版・非同期版で共通）
+def build_bulk_rows(
+    transactions: List[TransactionCreate], category_ids: Dict[str, int]
+) -> List[dict]:
+    rows = []
+    for transaction in transactions:
+        if transaction.category not in category_ids:
+            raise ValueError(f"Unknown category: {transaction.category}")
+        rows.append(
+            {
+                "date": transaction.date,
+                "amount": transaction.amount,
+                "content": transaction.content,
+                "type": transaction.type,
+                "category_id": category_ids[transaction.category],
+                "source": transaction.source,
+                "transaction_type": transaction.transaction_type,
+                "fingerprint": transaction.fingerprint,
+            }
+        )
+    return rows
+
+
+# 行の指紋のうち登録済みのものを調べる文（一意インデックスで BULK_INSERT_BATCH_SIZE 件ずつ）
+def iter_fingerprint_lookups(rows: List[dict]):
+    fingerprints = sorted({row["fingerprint"] for row in rows if row["fingerprint"]})
+    for start in range(0, len(fingerprints), BULK_INSERT_BATCH_SIZE):
+        yield select(Transaction.fingerprint).where(
+            Transaction.fingerprint.in_(
+                fingerprints[start : start + BULK_INSERT_BATCH_SIZE]
+            )
+        )
+
+
+# 登録済みの指紋と、同じリクエスト内で重複する指紋の行を除く
+def drop_known_fingerprints(rows: List[dict], known: Set[str]) -> List[dict]:
+    seen = set(known)
+    new_rows = []
+    for row in rows:
+        fingerprint = row["fingerprint"]
+        if fingerprint:
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+        new_rows.append(row)
+    return new_rows
+
+
+# INSERT ... RETURNING を BULK_INSERT_BATCH_SIZE 行ずつ送る文とバッチ
+# 確認後に他のリクエストが同じ指紋を登録していた場合に備え、衝突した行は登録しない
+def iter_bulk_insert_batches(rows: List[dict], dialect_name: str):
+    statement = (
+        dialect_insert(dialect_name)(Transaction)
+        .on_conflict_do_nothing(index_elements=[Transaction.fingerprint])
+        .returning(
+            Transaction.id, Transaction.fingerprint, sort_by_parameter_order=True
+        )
+    )
+    for start in range(0, len(rows), BULK_INSERT_BATCH_SIZE):
+        yield statement, rows[start : start + BULK_INSERT_BATCH_SIZE]
+
+
+# RETURNING の結果から、実際に登録された行だけを取り出す
+def inserted_rows(rows: List[dict], returned) -> List[dict]:
+    inserted = {fingerprint for _, fingerprint in returned}
+    return [
+        row for row in rows if not row["fingerprint"] or row["fingerprint"] in inserted
+    ]
+
+
+# 登録された行と RETURNING のIDから、検索インデックスに加える (ID, 内容) を作る
+def bulk_index_rows(rows: List[dict], returned) -> list:
+    return [
+        (transaction_id, row["date"], row["content"])
+        for (transaction_id, _), row in zip(returned, inserted_rows(rows, returned))
+    ]
+
+
+# 登録された行と RETURNING のIDから、分析用スナップショットの行を作る
+def bulk_snapshot_rows(rows: List[dict], returned) -> list:
+    return [
+        (
+            transaction_id,
+            row["date"],
+            row["amount"],
+            row["category_id"],
+            row["type"],
+            row["transaction_type"],
+            row["content"],
+        )
+        for (transaction_id, _), row in zip(returned, inserted_rows(rows, returned))
+    ]
+
+
+# 複数の取引を1つのDBトランザクションでまとめて登録し、IDを送信順に返す
+def create_transactions_bulk(
+    db: Session, transactions: List[TransactionCreate]
+) -> List[int]:
+    try:
+        category_ids = _get_category_ids(db, {t.category for t in transactions})
+        rows = build_bulk_rows(transactions, category_ids)
+        known = set()
+        for statement in iter_fingerprint_lookups(rows):
+            known.update(db.scalars(statement).all())
+        rows = drop_known_fingerprints(rows, known)
+
+        returned = []
+        dialect_name = db.get_bind().dialect.name
+        for statement, batch in iter_bulk_insert_batches(rows, dialect_name):
+            returned.extend(db.execute(statement, batch).all())
+        apply_monthly_deltas(db, bulk_monthly_entries(inserted_rows(rows, returned)))
+        update_search_index(db, added=bulk_index_rows(rows, returned))
+        version = bump_ledger_version(db)
+        db.commit()
+        ledger_snapshot.add(bulk_snapshot_rows(rows, returned), version)
+        return [transaction_id for transaction_id, _ in returned]
+
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error occurred while creating transactions in bulk: {e}")
+        raise
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"An unexpected error occurred: {e}")
+        raise
+
+
+# ルールに一致した取引のカテゴリを一括で付け替える
+# 列の値だけを読み、変更のある行だけを付け替え先のカテゴリごとの UPDATE でまとめて更新する
+def recategorize_transactions(
+    db: Session, categorizer: Categorizer, category: Optional[str] = None, **filters
+) -> Tuple[int, int]:
+    try:
+        category_ids = _get_category_ids(db, categorizer.categories())
+        unknown = categorizer.categories() - set(category_ids)
+        if unknown:
+            raise ValueError(f"Unknown category in rules: {', '.join(sorted(unknown))}")
+
+        category_id = None if category is None else _resolve_category_id(db, category)
+        statement = build_transactions_statement(
+            category_id=category_id, **filters
+        ).with_only_columns(
+            Transaction.id,
+            Transaction.date,
+            Transaction.content,
+            Transaction.type,
+            # 金額は整数なので Decimal への変換を省く
+            type_coerce(Transaction.amount, Integer),
+            Transaction.category_id,
+        )
+
+        scanned = 0
+        updated = 0
+        ids_by_category = defaultdict(list)
+        moves = defaultdict(lambda: [0, 0])
+        for (
+            transaction_id,
+            transaction_date,
+            content,
+            t_type,
+            amount,
+            old_id,
+        ) in db.execute(statement).tuples():
+            scanned += 1
+            matched = categorizer.categorize(content, t_type)
+            if matched is None:
+                continue
+            new_id = category_ids[matched]
+            if new_id == old_id:
+                continue
+            updated += 1
+            ids_by_category[new_id].append(transaction_id)
+            move = moves[(month_of(transaction_date), t_type, old_id, new_id)]
+            move[0] += amount
+            move[1] += 1
+
+        # 付け替え先のカテゴリごとに、ID を BULK_INSERT_BATCH_SIZE 件ずつまとめて更新する
+        for new_category_id, ids in ids_by_category.items():
+            for start in range(0, len(ids), BULK_INSERT_BATCH_SIZE):
+                db.execute(
+                    update(Transaction)
+                    .where(
+                        Transaction.id.in_(ids[start : start + BULK_INSERT_BATCH_SIZE])
+                    )
+                    .values(category_id=new_category_id),
+                    execution_options={"synchronize_session": False},
+                )
+        apply_category_moves(db, moves)
+        if updated:
+            bump_ledger_version(db)
+        db.commit()
+        if updated:
+            ledger_snapshot.invalidate()
+        return scanned, updated
+
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error occurred while recategorizing transactions: {e}")
+        raise
+
+
 def get_transaction_by_id(db: Session, transaction_id: int):
     return db.query(Transaction).filter(Transaction.id == transaction_id).first()
 
 
 def update_transaction(db: Session, transaction, updated_data: TransactionCreate):
+    old_entry = monthly_entry(transaction, -1)
+    old_key = (transaction.id, transaction.date)
+    old_content = transaction.content
     transaction.date = updated_data.date
     transaction.amount = updated_data.amount
     transaction.content = updated_data.content
     transaction.type = updated_data.type
-    transaction.category = updated_data.category
+    transaction.category_id = _resolve_category_id(db, updated_data.category)
+    apply_monthly_deltas(db, [old_entry, monthly_entry(transaction, 1)])
+    if (transaction.id, transaction.date) != old_key or (
+        transaction.content != old_content
+    ):
+        update_search_index(
+            db,
+            added=[(transaction.id, transaction.date, transaction.content)],
+            removed=[old_key],
+        )
+    version = bump_ledger_version(db)
     db.commit()
     db.refresh(transaction)
+    ledger_snapshot.replace(snapshot_row(transaction), version)
     return transaction
 
 
 def delete_transaction(db: Session, transaction):
+    transaction_id = transaction.id
+    apply_monthly_deltas(db, [monthly_entry(transaction, -1)])
+    update_search_index(db, removed=[(transaction_id, transaction.date)])
     db.delete(transaction)
+    version = bump_ledger_version(db)
     db.commit()
+    ledger_snapshot.remove(transaction_id, version)
@@ -0,0 +1,224 @@
+import logging  # ロギング用のインポート
+from datetime import date
+from typing import Dict, List, Optional
+
+from models.transaction import Transaction
+from schemas.transaction import TransactionCreate
+from services.analytics import ledger_snapshot, snapshot_row
+from services.category_cache import category_cache
+from services.ledger_version import build_bump_statement
+from services.monthly_totals import build_upsert_statement, collect_deltas
+from services.search_index import build_index_statements
+from services.transaction import (
+    build_bulk_rows,
+    build_search_statement,
+    build_summary_statement,
+    build_transactions_statement,
+    bulk_index_rows,
+    bulk_monthly_entries,
+    bulk_snapshot_rows,
+    drop_known_fingerprints,
+    inserted_rows,
+    iter_bulk_insert_batches,
+    iter_fingerprint_lookups,
+    monthly_entry,
+)
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# ロガーの設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# services/transaction.py の非同期版（SQLの組み立ては同期版と共通）
+
+
+async def get_transactions(db: AsyncSession, category: Optional[str] = None, **filters):
+    category_id = None
+    if category is not None:
+        category_id = await _resolve_category_id(db, category)
+    result = await db.scalars(
+        build_transactions_statement(category_id=category_id, **filters)
+    )
+    transactions = result.all()
+    if not category_cache.has_ids(t.category_id for t in transactions):
+        await db.run_sync(category_cache.load)
+    return [(t, category_cache.get_name(t.category_id)) for t in transactions]
+
+
+async def search_transactions(
+    db: AsyncSession,
+    query: str,
+    limit: int,
+    category: Optional[str] = None,
+    **filters,
+):
+    category_id = None
+    if category is not None:
+        category_id = await _resolve_category_id(db, category)
+    result = await db.scalars(
+        build_search_statement(
+            db.bind.dialect.name, query, limit, category_id=category_id, **filters
+        )
+    )
+    transactions = result.all()
+    if not category_cache.has_ids(t.category_id for t in transactions):
+        await db.run_sync(category_cache.load)
+    return [(t, category_cache.get_name(t.category_id)) for t in transactions]
+
+
+async def get_transaction_summary(
+    db: AsyncSession,
+    group_by: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    statement = build_summary_statement(
+        db.bind.dialect.name, group_by, date_from, date_to
+    )
+    result = await db.execute(statement)
+    return result.all()
+
+
+async def _apply_monthly_deltas(db: AsyncSession, entries):
+    deltas = collect_deltas(entries)
+    if deltas:
+        await db.execute(build_upsert_statement(db.bind.dialect.name), deltas)
+
+
+async def _update_search_index(db: AsyncSession, added=(), removed=()):
+    statements = build_index_statements(db.bind.dialect.name, added, removed)
+    for statement, parameters in statements:
+        await db.execute(statement, parameters)
+
+
+async def _bump_ledger_version(db: AsyncSession) -> int:
+    return await db.scalar(build_bump_statement(db.bind.dialect.name))
+
+
+async def _resolve_category_id(db: AsyncSession, name: str) -> int:
+    category_id = category_cache.get_id(name)
+    if category_id is None:
+        await db.run_sync(category_cache.load)
+        category_id = category_cache.get_id(name)
+    if category_id is None:
+        raise ValueError(f"Unknown category: {name}")
+    return category_id
+
+
+async def _get_category_ids(db: AsyncSession, names) -> Dict[str, int]:
+    if not category_cache.has_names(names):
+        await db.run_sync(category_cache.load)
+    return category_cache.ids_by_name()
+
+
+async def create_transaction(db: AsyncSession, transaction: TransactionCreate):
+    try:
+        db_transaction = Transaction(
+            date=transaction.date,
+            amount=transaction.amount,
+            content=transaction.content,
+            type=transaction.type,
+            category_id=await _resolve_category_id(db, transaction.category),
+            source=transaction.source,
+            transaction_type=transaction.transaction_type,
+            fingerprint=transaction.fingerprint,
+        )
+        db.add(db_transaction)
+        await _apply_monthly_deltas(db, [monthly_entry(db_transaction, 1)])
+        await db.flush()
+        await _update_search_index(
+            db,
+            added=[(db_transaction.id, db_transaction.date, db_transaction.content)],
+        )
+        version = await _bump_ledger_version(db)
+        await db.commit()
+        await db.refresh(db_transaction)
+        ledger_snapshot.add([snapshot_row(db_transaction)], version)
+        return db_transaction
+
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error(f"Error occurred while creating transaction: {e}")
+        raise
+
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}")
+        raise
+
+
+async def create_transactions_bulk(
+    db: AsyncSession, transactions: List[TransactionCreate]
+) -> List[int]:
+    try:
+        category_ids = await _get_category_ids(db, {t.category for t in transactions})
+        rows = build_bulk_rows(transactions, category_ids)
+        known = set()
+        for statement in iter_fingerprint_lookups(rows):
+            result = await db.scalars(statement)
+            known.update(result.all())
+        rows = drop_known_fingerprints(rows, known)
+
+        returned = []
+        for statement, batch in iter_bulk_insert_batches(rows, db.bind.dialect.name):
+            result = await db.execute(statement, batch)
+            returned.extend(result.all())
+        await _apply_monthly_deltas(
+            db, bulk_monthly_entries(inserted_rows(rows, returned))
+        )
+        await _update_search_index(db, added=bulk_index_rows(rows, returned))
+        version = await _bump_ledger_version(db)
+        await db.commit()
+        ledger_snapshot.add(bulk_snapshot_rows(rows, returned), version)
+        return [transaction_id for transaction_id, _ in returned]
+
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error(f"Error occurred while creating transactions in bulk: {e}")
+        raise
+
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"An unexpected error occurred: {e}")
+        raise
+
+
+async def get_transaction_by_id(db: AsyncSession, transaction_id: int):
+    return await db.get(Transaction, transaction_id)
+
+
+async def update_transaction(
+    db: AsyncSession, transaction, updated_data: TransactionCreate
+):
+    old_entry = monthly_entry(transaction, -1)
+    old_key = (transaction.id, transaction.date)
+    old_content = transaction.content
+    transaction.date = updated_data.date
+    transaction.amount = updated_data.amount
+    transaction.content = updated_data.content
+    transaction.type = updated_data.type
+    transaction.category_id = await _resolve_category_id(db, updated_data.category)
+    await _apply_monthly_deltas(db, [old_entry, monthly_entry(transaction, 1)])
+    if (transaction.id, transaction.date) != old_key or (
+        transaction.content != old_content
+    ):
+        await _update_search_index(
+            db,
+            added=[(transaction.id, transaction.date, transaction.content)],
+            removed=[old_key],
+        )
+    version = await _bump_ledger_version(db)
+    await db.commit()
+    await db.refresh(transaction)
+    ledger_snapshot.replace(snapshot_row(transaction), version)
+    return transaction
+
+
+async def delete_transaction(db: AsyncSession, transaction):
+    transaction_id = transaction.id
+    await _apply_monthly_deltas(db, [monthly_entry(transaction, -1)])
+    await _update_search_index(db, removed=[(transaction_id, transaction.date)])
+    await db.delete(transaction)
+    version = await _bump_ledger_version(db)
+    await db.commit()
+    ledger_snapshot.remove(transaction_id, version)
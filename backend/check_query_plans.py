@@ -0,0 +1,192 @@
+"""
+主要なクエリの実行計画を確認するスクリプト。
+
+サービス層の関数を実際に呼び出して発行されたSQLを記録し、EXPLAIN の結果に
+テーブルの全件走査（SQLite の "SCAN"、PostgreSQL の "Seq Scan"）が含まれていれば
+終了コード 1 で終了する。
+
+    python check_query_plans.py                  # 一時的なSQLiteにマイグレーションを適用して確認
+    python check_query_plans.py --url <DB URL>   # マイグレーション済みの既存DBで確認
+"""
+
+import argparse
+import re
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BACKEND_DIR / "app"))
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from seeds.category import seed_categories  # noqa: E402
+from services.category_cache import category_cache  # noqa: E402
+from services.transaction import (  # noqa: E402
+    get_category_by_name,
+    get_transaction_summary,
+    get_transactions,
+    search_transactions,
+)
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+DATE_FROM = date(2024, 1, 1)
+DATE_TO = date(2024, 1, 31)
+
+# (説明, 全件走査してはいけないテーブル, サービス層の呼び出し)
+HOT_QUERIES = [
+    (
+        "list by date range",
+        ["transactions"],
+        lambda db: get_transactions(
+            db, date_from=DATE_FROM, date_to=DATE_TO, limit=100
+        ),
+    ),
+    (
+        "list by type and date range",
+        ["transactions"],
+        lambda db: get_transactions(
+            db, date_from=DATE_FROM, date_to=DATE_TO, type="expense", limit=100
+        ),
+    ),
+    (
+        "list by category and date range",
+        ["transactions"],
+        lambda db: get_transactions(
+            db, date_from=DATE_FROM, date_to=DATE_TO, category="食費", limit=100
+        ),
+    ),
+    (
+        "daily summary",
+        ["transactions"],
+        lambda db: get_transaction_summary(db, "day", DATE_FROM, DATE_TO),
+    ),
+    (
+        "monthly summary",
+        ["transactions", "monthly_category_totals"],
+        lambda db: get_transaction_summary(db, "month", DATE_FROM, DATE_TO),
+    ),
+    (
+        "category summary",
+        ["transactions", "monthly_category_totals"],
+        lambda db: get_transaction_summary(db, "category", DATE_FROM, DATE_TO),
+    ),
+    (
+        "category summary (partial month)",
+        ["transactions"],
+        lambda db: get_transaction_summary(
+            db, "category", date(2024, 1, 5), date(2024, 1, 20)
+        ),
+    ),
+    (
+        "search by payee",
+        ["transactions", "transaction_search"],
+        lambda db: search_transactions(db, "セブンイレブン", 100),
+    ),
+    (
+        "search by payee and date range",
+        ["transactions", "transaction_search"],
+        lambda db: search_transactions(
+            db, "セブンイレブン", 100, date_from=DATE_FROM, date_to=DATE_TO
+        ),
+    ),
+    (
+        "category lookup by name",
+        ["categories"],
+        lambda db: get_category_by_name(db, "食費"),
+    ),
+]
+
+
+def migrate(url: str):
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    command.upgrade(config, "head")
+
+
+def explain(connection, statement: str, parameters) -> list:
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in rows]
+    rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+    return [row[0] for row in rows]
+
+
+def find_full_scans(plan: list, tables: list, dialect: str) -> list:
+    scans = []
+    for line in plan:
+        for table in tables:
+            if dialect == "sqlite":
+                # "SCAN transactions USING COVERING INDEX ..." もインデックス全体の走査なので対象
+                # 仮想テーブル（FTS5）は "VIRTUAL TABLE INDEX 0:" の後が空の場合だけが全件走査
+                pattern = rf"^SCAN {table}\b(?! VIRTUAL TABLE INDEX \d+:\S)"
+            else:
+                pattern = rf"Seq Scan on {table}\b"
+            if re.search(pattern, line.strip()):
+                scans.append(line.strip())
+    return scans
+
+
+def check(url: str) -> bool:
+    engine = create_engine(url)
+    Session = sessionmaker(bind=engine)
+
+    # アプリの起動時と同じく、カテゴリのキャッシュを読み込んだ状態で確認する
+    with Session() as db:
+        seed_categories(db)
+        category_cache.load(db)
+
+    ok = True
+    for description, tables, run_query in HOT_QUERIES:
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            with Session() as db:
+                run_query(db)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        with engine.connect() as connection:
+            if connection.dialect.name == "postgresql":
+                # 件数の少ないテーブルでもインデックスを使えるかどうかを確認する
+                connection.exec_driver_sql("SET enable_seqscan = off")
+            for statement, parameters in statements:
+                plan = explain(connection, statement, parameters)
+                scans = find_full_scans(plan, tables, connection.dialect.name)
+                status = "FAIL" if scans else "ok"
+                print(f"[{status}] {description}")
+                for line in plan:
+                    print(f"    {line}")
+                ok = ok and not scans
+
+    engine.dispose()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--url", help="確認するDBのURL（マイグレーション済みであること）"
+    )
+    args = parser.parse_args()
+
+    if args.url:
+        ok = check(args.url)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            url = f"sqlite:///{Path(tmp_dir) / 'query_plan.db'}"
+            migrate(url)
+            ok = check(url)
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+分析用の列指向スナップショット（services/analytics.py）の速度とメモリ使用量を測るベンチマーク。
+
+一時的なSQLiteファイルに datagen で生成したN年分の取引を登録し、全期間の
+合計・月別の内訳・カテゴリ別の内訳・支払先の上位10件を、次の3つの方法で求めて比べる。
+
+- orm: ORMオブジェクトを全件読み込んで Python で集計する
+- sql: SQL の SUM ... GROUP BY
+- snapshot: スナップショット（作成時間は別に表示する）
+
+    python benchmarks/analytics_snapshot.py [--years 10] [--per-day 100] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from datagen import generate_transactions
+
+BACKEND_APP_DIR = Path(__file__).resolve().parents[1] / "backend" / "app"
+
+
+def best_of(repeat: int, function) -> float:
+    timings = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - began)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--per-day", type=float, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmp_dir) / 'bench.db'}"
+    sys.path.insert(0, str(BACKEND_APP_DIR))
+    from core.database import SessionLocal, engine
+    from core.startup import initialize_database
+    from models.transaction import Transaction
+    from services.analytics import LedgerSnapshot
+    from services.bulk_load import load_transactions
+    from sqlalchemy import Integer, func, select, type_coerce
+
+    initialize_database(engine)
+    with SessionLocal() as db:
+        inserted, _, _ = load_transactions(
+            db, generate_transactions(args.years, args.per_day)
+        )
+    print(f"{inserted:,d} transactions")
+
+    amount = type_coerce(Transaction.amount, Integer)
+    income = func.sum(amount).filter(Transaction.type == "income")
+    expense = func.sum(amount).filter(Transaction.type == "expense")
+    month = func.strftime("%Y-%m", Transaction.date)
+
+    def orm(db):
+        def run():
+            totals = defaultdict(int)
+            months = defaultdict(int)
+            categories = defaultdict(int)
+            payees = defaultdict(int)
+            for t in db.query(Transaction).all():
+                totals[t.type] += t.amount
+                months[(t.date.strftime("%Y-%m"), t.type)] += t.amount
+                categories[(t.category_id, t.type)] += t.amount
+                if t.type == "expense":
+                    payees[t.content] += t.amount
+            sorted(payees.items(), key=lambda item: -item[1])[:10]
+            db.expunge_all()
+
+        return run
+
+    def sql(db):
+        def run():
+            db.execute(select(income, expense)).all()
+            db.execute(select(month, income, expense).group_by(month)).all()
+            db.execute(
+                select(Transaction.category_id, income, expense).group_by(
+                    Transaction.category_id
+                )
+            ).all()
+            db.execute(
+                select(Transaction.content, func.sum(amount))
+                .where(Transaction.type == "expense")
+                .group_by(Transaction.content)
+                .order_by(func.sum(amount).desc())
+                .limit(10)
+            ).all()
+
+        return run
+
+    snapshot = LedgerSnapshot()
+
+    def from_snapshot():
+        snapshot.totals()
+        snapshot.breakdown("month")
+        snapshot.breakdown("category")
+        snapshot.top_payees(10)
+
+    with SessionLocal() as db:
+        build_ms = best_of(1, lambda: snapshot.build(db))
+        results = {
+            "orm": best_of(max(1, args.repeat // 2), orm(db)),
+            "sql": best_of(args.repeat, sql(db)),
+            "snapshot": best_of(args.repeat, from_snapshot),
+        }
+    for name, elapsed in results.items():
+        print(f"{name:10s} {elapsed:9.1f} ms (4 queries)")
+    stats = snapshot.stats()
+    print(f"snapshot build {build_ms:.0f} ms, memory {stats['memory_total']:,d} bytes")
+    for name, size in stats["memory"].items():
+        print(f"  {name:20s} {size:>12,d}")
+
+
+if __name__ == "__main__":
+    main()
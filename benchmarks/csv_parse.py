@@ -0,0 +1,69 @@
+"""
+finance の CSV 解析（1プロセス）の速度を測るベンチマーク。
+
+ゆうちょ銀行・楽天カード・三井住友カードの形式の明細を一時ディレクトリに生成し、
+各データソースの解析（文字コード判定・行の変換・指紋・カテゴリ分類を含む）にかかる時間から
+rows/s を求める。支払先と日付は実際の明細と同じく繰り返し現れるようにする。
+マニフェストの更新とリネームは行わない。
+
+    python benchmarks/csv_parse.py [--rows 100000] [--repeat 3]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from datagen import write_statements
+
+FINANCE_DIR = Path(__file__).resolve().parents[1] / "finance"
+sys.path.insert(0, str(FINANCE_DIR))
+
+from csv_file import JapanPost, MitsuiSumitomo, Rakuten  # noqa: E402
+from manifest import ImportManifest  # noqa: E402
+
+
+def run(base_path: Path, repeat: int) -> dict:
+    results = {}
+    for source_class in (JapanPost, Rakuten, MitsuiSumitomo):
+        best = None
+        for _ in range(repeat):
+            # 毎回新しいインスタンス（メモ・キャッシュが空の状態）から測る
+            source = source_class()
+            source.base_path = base_path
+            source.manifest = ImportManifest(base_path / "manifest.json")
+            csv_file_path = base_path / source.target_file_path / "statement.csv"
+            began = time.perf_counter()
+            count = sum(1 for _ in source._iter_new_rows(csv_file_path, {}))
+            elapsed = time.perf_counter() - began
+            best = elapsed if best is None else min(best, elapsed)
+        results[source_class.__name__] = (count, best)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base_path = Path(tmp_dir)
+        write_statements(base_path, args.rows)
+        results = run(base_path, args.repeat)
+
+    total_rows = sum(count for count, _ in results.values())
+    total_time = sum(elapsed for _, elapsed in results.values())
+    for name, (count, elapsed) in results.items():
+        print(
+            f"{name:16s} {count:>9,d} rows {elapsed:7.3f}s {count / elapsed:>10,.0f} rows/s"
+        )
+    print(
+        f"{'total':16s} {total_rows:>9,d} rows {total_time:7.3f}s "
+        f"{total_rows / total_time:>10,.0f} rows/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+ベンチマーク用の合成データを生成する。
+
+- generate_transactions: N年分の取引（一括登録APIと同じキーの辞書）。毎月の給与と、
+  1日あたり平均 per_day 件の支出（支払先ごとにカテゴリ・金額の幅が決まっている）
+- write_statements: ゆうちょ銀行（Shift_JIS）・楽天カード（BOM付きUTF-8）・
+  三井住友カード（Shift_JIS）の形式の明細CSV。支払先と日付は実際の明細と同じく繰り返し現れる
+
+乱数のシードを固定しているため、同じ引数からは常に同じデータができる。
+
+    python benchmarks/datagen.py --years 3 --out /tmp/bench-data
+"""
+
+import argparse
+import json
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterator
+
+START_DATE = date(2020, 1, 1)
+
+PAYEES = [
+    "ｾﾌﾞﾝｲﾚﾌﾞﾝ ｼﾌﾞﾔ",
+    "ﾛｰｿﾝ ｼﾝｼﾞｭｸ",
+    "AMAZON.CO.JP",
+    "ＪＲ東日本　モバイルＳｕｉｃａ",
+    "ﾏｸﾄﾞﾅﾙﾄﾞ",
+    "東京電力エナジーパートナー",
+    "NETFLIX.COM",
+    "ﾌｧﾐﾘｰﾏｰﾄ",
+    "ﾆﾄﾘ ﾈｯﾄ",
+    "ｽｰﾊﾟｰ ﾗｲﾌ",
+]
+
+# (支払先, カテゴリ, 最小金額, 最大金額)
+EXPENSES = [
+    ("セブンイレブン", "食費", 150, 1500),
+    ("ローソン", "食費", 150, 1500),
+    ("スーパー ライフ", "食費", 800, 6000),
+    ("マクドナルド", "食費", 400, 1200),
+    ("AMAZON.CO.JP", "日用品", 500, 12000),
+    ("ニトリ ネット", "日用品", 1000, 30000),
+    ("モバイルSuica", "交通費", 500, 5000),
+    ("NETFLIX.COM", "娯楽", 990, 1980),
+    ("東京電力エナジーパートナー", "住居費", 3000, 15000),
+    ("居酒屋 かんぱい", "交際費", 3000, 8000),
+]
+
+
+def generate_transactions(
+    years: int, per_day: float = 5, seed: int = 0, start: date = START_DATE
+) -> Iterator[dict]:
+    """N年分の取引を日付順に返す（毎月25日の給与と、1日あたり平均 per_day 件の支出）"""
+    rng = random.Random(seed)
+    end = start.replace(year=start.year + years)
+    day = start
+    while day < end:
+        if day.day == 25:
+            yield {
+                "date": day.isoformat(),
+                "amount": 300_000,
+                "content": "給与",
+                "type": "income",
+                "category": "給与",
+            }
+        for _ in range(int(rng.expovariate(1 / per_day) + 0.5)):
+            content, category, low, high = rng.choice(EXPENSES)
+            yield {
+                "date": day.isoformat(),
+                "amount": rng.randint(low, high),
+                "content": content,
+                "type": "expense",
+                "category": category,
+            }
+        day += timedelta(days=1)
+
+
+def write_statements(base_path: Path, rows: int, seed: int = 0):
+    """各明細形式で rows 行のCSVを base_path/<データソースのディレクトリ>/statement.csv に書く"""
+    rng = random.Random(seed)
+    days = [START_DATE + timedelta(days=rng.randrange(1500)) for _ in range(rows)]
+    days.sort()
+
+    def payee(i):
+        return f"{PAYEES[i % len(PAYEES)]} {i % 200}"
+
+    lines = ["取引日,受入金額,受入金額,払出金額,詳細１,詳細２,現在高"]
+    for i, day in enumerate(days):
+        lines.append(f"{day:%Y%m%d},,,{100 + i % 9000},振替,{payee(i)},0")
+    path = base_path / "bank" / "japan_post"
+    path.mkdir(parents=True)
+    (path / "statement.csv").write_bytes(
+        ("\r\n".join(lines) + "\r\n").encode("shift_jis")
+    )
+
+    lines = [
+        '"利用日","利用店名・商品名","利用者","支払方法","利用金額","支払手数料","支払総額"'
+    ]
+    for i, day in enumerate(days):
+        amount = 100 + i % 9000
+        lines.append(
+            f'"{day:%Y/%m/%d}","{payee(i)}","本人","1回払い","{amount}","0","{amount}"'
+        )
+    path = base_path / "credit_card" / "rakuten"
+    path.mkdir(parents=True)
+    (path / "statement.csv").write_text("﻿" + "\n".join(lines) + "\n", "utf-8")
+
+    lines = ["山田　太郎　様,1234-****-****-5678,三井住友カード"]
+    for i, day in enumerate(days):
+        amount = 100 + i % 9000
+        lines.append(f"{day:%Y/%m/%d},{payee(i)},{amount},１,１,{amount},")
+    path = base_path / "credit_card" / "mitsui_sumitomo"
+    path.mkdir(parents=True)
+    (path / "statement.csv").write_bytes(
+        ("\r\n".join(lines) + "\r\n").encode("shift_jis")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--per-day", type=float, default=5)
+    parser.add_argument("--rows", type=int, default=10_000, help="明細CSVの行数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, required=True)
+    args = parser.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with open(args.out / "transactions.ndjson", "w", encoding="utf-8") as file:
+        for item in generate_transactions(args.years, args.per_day, args.seed):
+            file.write(json.dumps(item, ensure_ascii=False) + "\n")
+            count += 1
+    write_statements(args.out / "csv_files", args.rows, args.seed)
+    print(f"{count} transactions, {args.rows} rows per statement -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+一括登録の実行中に一覧取得のレイテンシがどう変わるかを測るベンチマーク。
+
+一時的なSQLiteファイルに対して、書き込みスレッドが create_transactions_bulk で
+取引を登録し続ける間、読み込みスレッドが get_transactions（1か月分・100件）を
+繰り返し実行してレイテンシを記録する。SQLITE_PRAGMAS を無効（SQLite の既定値）
+と有効（WAL など）の両方で子プロセスとして実行し、結果を並べて表示する。
+
+    python benchmarks/read_during_import.py [--rows 200000] [--batch 5000]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+BACKEND_APP_DIR = Path(__file__).resolve().parents[1] / "backend" / "app"
+
+
+def run_single(rows: int, batch: int):
+    sys.path.insert(0, str(BACKEND_APP_DIR))
+    from core.database import SessionLocal, engine
+    from core.startup import initialize_database
+    from schemas.transaction import TransactionCreate
+    from services.transaction import create_transactions_bulk, get_transactions
+
+    # アプリの起動時と同じく、テーブル・検索インデックス・カテゴリを作る
+    initialize_database(engine)
+
+    start_date = date(2020, 1, 1)
+    items = [
+        TransactionCreate(
+            date=start_date + timedelta(days=i % 1500),
+            amount=100 + i % 5000,
+            content=f"payee {i % 300}",
+            type="expense",
+            category="食費",
+        )
+        for i in range(rows)
+    ]
+
+    latencies = []
+    errors = 0
+    writer_errors = []
+    done = threading.Event()
+
+    def writer():
+        try:
+            with SessionLocal() as db:
+                for offset in range(0, rows, batch):
+                    create_transactions_bulk(db, items[offset : offset + batch])
+        except Exception as e:
+            writer_errors.append(e)
+        finally:
+            # 書き込みが失敗しても読み込みスレッドを止める
+            done.set()
+
+    def reader():
+        nonlocal errors
+        month = 0
+        while not done.is_set():
+            date_from = start_date + timedelta(days=30 * (month % 48))
+            month += 1
+            began = time.perf_counter()
+            try:
+                with SessionLocal() as db:
+                    get_transactions(
+                        db,
+                        date_from=date_from,
+                        date_to=date_from + timedelta(days=30),
+                        limit=100,
+                    )
+            except Exception:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - began) * 1000)
+
+    began = time.perf_counter()
+    threads = [threading.Thread(target=writer), threading.Thread(target=reader)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    if writer_errors:
+        raise writer_errors[0]
+
+    latencies.sort()
+    print(
+        json.dumps(
+            {
+                "import_rows_per_sec": round(rows / elapsed),
+                "reads": len(latencies),
+                "read_errors": errors,
+                "read_p50_ms": round(statistics.median(latencies), 2),
+                "read_p95_ms": round(latencies[int(len(latencies) * 0.95)], 2),
+                "read_max_ms": round(latencies[-1], 2),
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=5_000)
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        run_single(args.rows, args.batch)
+        return
+
+    for label, pragmas in (("default", "false"), ("tuned", "true")):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{Path(tmp_dir) / 'bench.db'}",
+                SQLITE_PRAGMAS=pragmas,
+            )
+            output = subprocess.run(
+                [sys.executable, __file__, "--single"]
+                + ["--rows", str(args.rows), "--batch", str(args.batch)],
+                env=env,
+                cwd=tmp_dir,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{label:8s} {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+内容（支払先）の検索（services/search_index.py）の速度を測るベンチマーク。
+
+一時的なSQLiteファイルに datagen で生成したN年分の取引（件数の少ない支払先を加える）を
+直接取り込みで登録し、同じ検索語で次の2つの方法の時間（中央値）を比べる。結果が一致しない場合は
+終了コード1で終わる。
+
+- like: transactions.content に対する LIKE '%...%'（全件走査）
+- index: 検索インデックス（FTS5 の trigram）
+
+    python benchmarks/search.py [--years 10] [--per-day 100] [--repeat 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from itertools import chain
+from pathlib import Path
+
+from datagen import START_DATE, generate_transactions
+
+BACKEND_APP_DIR = Path(__file__).resolve().parents[1] / "backend" / "app"
+
+# 件数の少ない支払先（1年に1回ずつ、合計件数は年数と同じ）
+RARE_PAYEES = ["ブルーボトルコーヒー 清澄白河", "紀伊國屋書店 新宿本店"]
+
+# (説明, 検索語)
+QUERIES = [
+    ("rare payee", "ブルーボトル"),
+    ("rare payee (halfwidth)", "ｺｰﾋｰ"),
+    ("common payee", "ローソン"),
+    ("short query", "ライ"),
+]
+
+
+def rare_transactions(years: int):
+    for year in range(years):
+        for index, content in enumerate(RARE_PAYEES):
+            yield {
+                "date": START_DATE.replace(
+                    year=START_DATE.year + year, month=index + 1
+                ).isoformat(),
+                "amount": 1000,
+                "content": content,
+                "type": "expense",
+                "category": "娯楽",
+            }
+
+
+def median_ms(repeat: int, function):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        began = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - began)
+    return statistics.median(timings) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--per-day", type=float, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmp_dir) / 'bench.db'}"
+    sys.path.insert(0, str(BACKEND_APP_DIR))
+    from core.database import SessionLocal, engine
+    from core.startup import initialize_database
+    from models.transaction import Transaction
+    from services.bulk_load import load_transactions
+    from services.search_index import normalize_search_text
+    from services.transaction import build_transactions_statement, search_transactions
+
+    initialize_database(engine)
+    with SessionLocal() as db:
+        began = time.perf_counter()
+        inserted, _, _ = load_transactions(
+            db,
+            chain(
+                generate_transactions(args.years, args.per_day),
+                rare_transactions(args.years),
+            ),
+        )
+        load_ms = (time.perf_counter() - began) * 1000
+    print(f"{inserted:,d} transactions (direct import {load_ms:,.0f} ms)")
+
+    def like(db, query):
+        statement = (
+            build_transactions_statement()
+            .where(
+                Transaction.content.contains(
+                    normalize_search_text(query), autoescape=True
+                )
+            )
+            .order_by(None)
+            .order_by(Transaction.date.desc(), Transaction.id.desc())
+            .limit(args.limit)
+        )
+        return lambda: [t.id for t in db.scalars(statement).all()]
+
+    def index(db, query):
+        return lambda: [t.id for t, _ in search_transactions(db, query, args.limit)]
+
+    ok = True
+    print(f"{'query':24s} {'like':>10s} {'index':>10s}  matches")
+    with SessionLocal() as db:
+        for description, query in QUERIES:
+            like_ms, expected = median_ms(args.repeat, like(db, query))
+            index_ms, found = median_ms(args.repeat, index(db, query))
+            print(f"{description:24s} {like_ms:8.1f}ms {index_ms:8.1f}ms  {len(found)}")
+            if found != expected:
+                print(f"  results differ for {query!r}")
+                ok = False
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+APIのワーカー1つの起動時間（main のインポートと lifespan の起動時の処理）を測るベンチマーク。
+
+一時的なSQLiteファイルに対して、子プロセスで main をインポートして lifespan を実行する。
+1回目は空のDB（テーブルの作成・カテゴリの投入を含む）、2回目以降は作成済みのDBでの時間で、
+作成済みのDBでの中央値が --target-ms を超えた場合は終了コード1で終わる。
+
+    python benchmarks/startup.py [--runs 10] [--target-ms 1500]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_APP_DIR = Path(__file__).resolve().parents[1] / "backend" / "app"
+
+
+def run_single():
+    sys.path.insert(0, str(BACKEND_APP_DIR))
+    began = time.perf_counter()
+    from main import app
+
+    imported = time.perf_counter()
+
+    async def start():
+        async with app.router.lifespan_context(app):
+            pass
+
+    asyncio.run(start())
+    started = time.perf_counter()
+    print(
+        json.dumps(
+            {
+                "import_ms": (imported - began) * 1000,
+                "startup_ms": (started - imported) * 1000,
+                "total_ms": (started - began) * 1000,
+            }
+        )
+    )
+
+
+def measure(env: dict, cwd: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, "--single"],
+        env=env,
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--target-ms", type=float, default=1500)
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        run_single()
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+        cold = measure(env, tmp_dir)
+        warm = [measure(env, tmp_dir) for _ in range(args.runs)]
+
+    print(
+        f"{'empty db':12s} import {cold['import_ms']:7.1f} ms  "
+        f"startup {cold['startup_ms']:7.1f} ms  total {cold['total_ms']:7.1f} ms"
+    )
+    medians = {
+        key: statistics.median(run[key] for run in warm)
+        for key in ("import_ms", "startup_ms", "total_ms")
+    }
+    print(
+        f"{'initialized':12s} import {medians['import_ms']:7.1f} ms  "
+        f"startup {medians['startup_ms']:7.1f} ms  total {medians['total_ms']:7.1f} ms"
+        f"  (median of {args.runs})"
+    )
+    if medians["total_ms"] > args.target_ms:
+        print(f"startup is slower than the target ({args.target_ms:.0f} ms)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+API と取り込みの主要な処理の性能をまとめて測り、JSONに保存して前回の結果と比較するベンチマーク。
+
+- api: 一時的なSQLiteファイルに datagen で生成したN年分の取引を一括登録API（NDJSON、1,000件ずつ）で
+  登録し、1件ずつの登録APIと合わせて登録のスループットを測る。その後、一覧・集計APIの
+  レイテンシ（p50・p95）を FastAPI の TestClient で測る（レスポンスキャッシュは無効にする）
+- csv: 各明細形式の CSV 解析の rows/s（csv_parse.py と同じ測り方）
+
+各部分は環境変数とモジュールを分けるため子プロセスで実行する。--baseline に前回の結果を渡すと、
+--threshold（既定は20%）を超えて悪化した指標を表示し、終了コード1で終わる。
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --baseline results.json [--threshold 0.2]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from datagen import START_DATE, generate_transactions, write_statements
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+BACKEND_APP_DIR = BENCHMARKS_DIR.parent / "backend" / "app"
+
+PARTS = ("api", "csv")
+
+# 一括登録APIに1リクエストで送る件数
+BULK_BATCH_SIZE = 1_000
+# レイテンシの計測前に各エンドポイントへ送るリクエスト数
+WARMUP_REQUESTS = 5
+
+
+def _percentile(values, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def _month_ranges(years: int):
+    ranges = []
+    month_start = START_DATE
+    for _ in range(years * 12):
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        ranges.append((month_start, next_month - timedelta(days=1)))
+        month_start = next_month
+    return ranges
+
+
+def run_api(args) -> dict:
+    sys.path.insert(0, str(BACKEND_APP_DIR))
+    from fastapi.testclient import TestClient
+    from main import app
+
+    # with で起動時の処理（テーブルの作成・カテゴリの投入）を実行する
+    with TestClient(app) as client:
+        return _measure_api(client, args)
+
+
+def _measure_api(client, args) -> dict:
+    results = {}
+
+    items = list(generate_transactions(args.years, args.per_day))
+    began = time.perf_counter()
+    for offset in range(0, len(items), BULK_BATCH_SIZE):
+        body = "\n".join(
+            json.dumps(item, ensure_ascii=False)
+            for item in items[offset : offset + BULK_BATCH_SIZE]
+        )
+        response = client.post(
+            "/api/transactions/bulk",
+            content=body.encode("utf-8"),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        response.raise_for_status()
+    results["rows"] = len(items)
+    results["bulk_insert_rows_per_sec"] = len(items) / (time.perf_counter() - began)
+
+    # 登録済みの期間の後の日付で、1件ずつ登録する
+    singles = generate_transactions(
+        1,
+        args.per_day,
+        seed=1,
+        start=START_DATE.replace(year=START_DATE.year + args.years),
+    )
+    began = time.perf_counter()
+    for _ in range(args.singles):
+        client.post("/api/transactions", json=next(singles)).raise_for_status()
+    results["single_insert_per_sec"] = args.singles / (time.perf_counter() - began)
+
+    months = _month_ranges(args.years)
+    endpoints = {
+        "list_first_page": lambda i: "/api/transactions?limit=100",
+        "list_month": lambda i: (
+            f"/api/transactions?from={months[i % len(months)][0]}"
+            f"&to={months[i % len(months)][1]}&limit=100"
+        ),
+        "summary_month": lambda i: "/api/transactions/summary?group_by=month",
+        "summary_category_month": lambda i: (
+            f"/api/transactions/summary?group_by=category"
+            f"&from={months[i % len(months)][0]}&to={months[i % len(months)][1]}"
+        ),
+    }
+    for name, url in endpoints.items():
+        for i in range(WARMUP_REQUESTS):
+            client.get(url(i)).raise_for_status()
+        latencies = []
+        for i in range(args.requests):
+            began = time.perf_counter()
+            client.get(url(i)).raise_for_status()
+            latencies.append((time.perf_counter() - began) * 1000)
+        results[f"{name}_p50_ms"] = statistics.median(latencies)
+        results[f"{name}_p95_ms"] = _percentile(latencies, 0.95)
+    return results
+
+
+def run_csv(args) -> dict:
+    from csv_parse import run
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base_path = Path(tmp_dir)
+        write_statements(base_path, args.csv_rows)
+        parsed = run(base_path, args.repeat)
+    return {
+        f"csv_{name.lower()}_rows_per_sec": count / elapsed
+        for name, (count, elapsed) in parsed.items()
+    }
+
+
+def run_part(part: str, args) -> dict:
+    command = [sys.executable, __file__, "--part", part] + [
+        f"--years={args.years}",
+        f"--per-day={args.per_day}",
+        f"--singles={args.singles}",
+        f"--requests={args.requests}",
+        f"--csv-rows={args.csv_rows}",
+        f"--repeat={args.repeat}",
+    ]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{Path(tmp_dir) / 'bench.db'}",
+            RESPONSE_CACHE_ENABLED="false",
+        )
+        output = subprocess.run(
+            command, env=env, cwd=tmp_dir, capture_output=True, text=True
+        )
+    if output.returncode != 0:
+        sys.stderr.write(output.stderr)
+        raise SystemExit(f"benchmark part {part!r} failed")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCHMARKS_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def lower_is_better(name: str) -> bool:
+    # *_ms はレイテンシ（小さいほど良い）、*_per_sec はスループット（大きいほど良い）
+    return name.endswith("_ms")
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """baseline から threshold を超えて悪化した指標の (名前, 前回, 今回, 変化率) を返す"""
+    regressions = []
+    for name, previous in baseline["metrics"].items():
+        current = results["metrics"].get(name)
+        if current is None or not previous or not name.endswith(("_ms", "_per_sec")):
+            continue
+        change = (current - previous) / previous
+        worse = change if lower_is_better(name) else -change
+        if worse > threshold:
+            regressions.append((name, previous, current, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--per-day", type=float, default=5)
+    parser.add_argument("--singles", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--csv-rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--parts", default=",".join(PARTS))
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--part", choices=PARTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.part:
+        run = run_api if args.part == "api" else run_csv
+        print(json.dumps(run(args)))
+        return
+
+    metrics = {}
+    for part in args.parts.split(","):
+        metrics.update(run_part(part, args))
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "years": args.years,
+            "per_day": args.per_day,
+            "singles": args.singles,
+            "requests": args.requests,
+            "csv_rows": args.csv_rows,
+            "repeat": args.repeat,
+        },
+        "metrics": {name: round(value, 2) for name, value in metrics.items()},
+    }
+    for name, value in results["metrics"].items():
+        print(f"{name:40s} {value:>12,.2f}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("parameters") != results["parameters"]:
+            print("warning: baseline was measured with different parameters")
+        regressions = compare(results, baseline, args.threshold)
+        for name, previous, current, change in regressions:
+            print(
+                f"REGRESSION {name}: {previous:,.2f} -> {current:,.2f} ({change:+.0%})"
+            )
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions over {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
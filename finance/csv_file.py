@@ -1,28 +1,91 @@
 import csv
+import hashlib
+import io
+import mmap
+import os
+import sys
 from abc import ABC, abstractmethod
-from datetime import datetime
+from collections import Counter
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, Iterator, List, Optional, Union
 
-from category import COMPANY, MITSUI_SUMITOMO_CARD, RAKUTEN_CARD
-from schemas import Transaction
-from utils import convert_string, setup_logger
+from formats import StatementFormat, compile_parser, load_formats
+from manifest import ImportManifest
+from records import TransactionRecord, validate_records
+from utils import detect_encoding, fingerprint_key, make_fingerprint, setup_logger
 
 logger = setup_logger()
 
+# カテゴリ分類のルールエンジンとルールは backend と共通
+# （services/categorizer.py は標準ライブラリのみに依存する）
+# backend/app のモジュールは core・models・schemas・services などの最上位の名前で互いを読み込むため、
+# finance のモジュール名はそれらと重ならないようにする（取引のレコードは records.py）
+BACKEND_APP_DIR = Path(__file__).resolve().parents[1] / "backend" / "app"
+sys.path.append(str(BACKEND_APP_DIR))
+from services.categorizer import load_categorizer  # noqa: E402
+
+CATEGORY_RULES_PATH = os.environ.get(
+    "CATEGORY_RULES_PATH", str(BACKEND_APP_DIR / "seeds" / "category_rules.json")
+)
+
+# 明細を置くディレクトリ
+CSV_FILES_DIR = Path(__file__).parent / "csv_files"
+
+# 形式を判定して各データソースのディレクトリに振り分けるCSVを置くディレクトリ（csv_files 直下）
+INBOX_DIR_NAME = "inbox"
+
+# 取り込み済みのファイルを記録するマニフェスト（csv_files 直下）
+MANIFEST_FILE_NAME = ".import_manifest.json"
+
+# まとめて検証するレコードの件数
+VALIDATION_BATCH_SIZE = 1000
+
+# ダイジェストの計算で一度に読み込むバイト数
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+
+def _update_digest(hasher, file, length: int):
+    # ファイルの現在位置から length バイトをチャンクごとにハッシュに加える
+    while length > 0:
+        chunk = file.read(min(DIGEST_CHUNK_SIZE, length))
+        if not chunk:
+            break
+        hasher.update(chunk)
+        length -= len(chunk)
+
 
 class CsvFile(ABC):
     def __init__(
         self, encoding: List[str] = ["utf-8", "shift_jis"], target_file_path: str = ""
     ):
-        self.base_path = Path(__file__).parent / "csv_files"
+        self.base_path = CSV_FILES_DIR
         self.encoding = encoding
         self.target_file_path = Path(target_file_path)
+        self.name = type(self).__name__
+        self.glob = "*.csv"
+        self.skip_rows = 1  # 先頭の読み飛ばす行数（ヘッダー）
+        # ディレクトリ（データソース）ごとに判定済みの文字コード
+        self._encoding_cache = {}
+        # 取り込み済みのファイルの記録（全データソースで共通のファイル）
+        self.manifest = ImportManifest(self.base_path / MANIFEST_FILE_NAME)
+        self.categorizer = load_categorizer(CATEGORY_RULES_PATH)
 
-    def process_files(self):
+    def process_files(
+        self, lazy: bool = False
+    ) -> Union[List[List[TransactionRecord]], Iterator[TransactionRecord]]:
+        """lazy=True の場合、全ファイルの取引を1件ずつ返すイテレータを返す"""
         target_path = Path(self.base_path) / self.target_file_path
         csv_files = self._get_csv_files(target_path)
 
+        if lazy:
+            return (
+                transaction
+                for csv_file in csv_files
+                for transaction in self._process_file(
+                    Path(target_path) / csv_file, lazy=True
+                )
+            )
+
         contents = []
         for csv_file in csv_files:
             csv_file_path = Path(target_path) / csv_file
@@ -30,155 +93,229 @@ class CsvFile(ABC):
         return contents
 
     def _get_csv_files(self, target_path):
-        csv_files = target_path.glob("*.csv")
+        # 並列取り込みでも同じ順序で結果を返せるよう、ファイル名順に並べる
+        csv_files = sorted(target_path.glob(self.glob))
+        names = {f.name for f in csv_files}
         unprocessed_csv_files = []
         for f in csv_files:
             # if not f.name.endswith(".processed.csv"):
+            # 同じ名前の新しいファイル（再ダウンロード分）があれば、処理済みの方は読まない
+            # （マニフェストのキーが同じで、新しい方がリネーム時に置き換える）
+            if f.name.replace(".processed.csv", ".csv") in names - {f.name}:
+                continue
             unprocessed_csv_files.append(f)
         return unprocessed_csv_files
 
-    def _process_file(self, csv_file_path: Path) -> List[Tuple]:
-        for enc in self.encoding:
-            try:
-                with open(csv_file_path, "r", encoding=enc) as file:
-                    reader = csv.reader(file)
+    def _process_file(
+        self, csv_file_path: Path, lazy: bool = False, rename: bool = True
+    ) -> Union[List[TransactionRecord], Iterator[TransactionRecord]]:
+        """lazy=True の場合、取引を1件ずつ返すイテレータを返す
+
+        rename=False の場合、マニフェストへの記録と処理済みへのリネームを行わない
+        """
+        transactions = self._iter_file(csv_file_path, rename=rename)
+        return transactions if lazy else list(transactions)
+
+    def _iter_file(
+        self, csv_file_path: Path, rename: bool = True
+    ) -> Iterator[TransactionRecord]:
+        checkpoint = {}
+        yield from self._iter_new_rows(csv_file_path, checkpoint)
+        if rename:
+            self._finish_file(csv_file_path, checkpoint)
+
+    def _iter_new_rows(
+        self, csv_file_path: Path, checkpoint: dict
+    ) -> Iterator[TransactionRecord]:
+        """前回の取り込み以降に追記された行だけを解析する
+
+        行は TransactionRecord に変換し、VALIDATION_BATCH_SIZE 件ごとにまとめて検証してから返す。
+        解析が終わると、マニフェストに保存する内容を checkpoint に設定する。
+        """
+        entry = self.manifest.get(self._manifest_key(csv_file_path))
+        offset, digest = self._resume_offset(csv_file_path, entry)
+        size = os.path.getsize(csv_file_path)
+
+        if offset:
+            # 前回と同じ文字コード・指紋の出現回数から続ける
+            enc = entry["encoding"]
+            occurrences = Counter(entry["occurrences"])
+            rows = entry["rows"]
+            logger.info(f"{csv_file_path.name}: {offset} バイト目から再開します")
+        else:
+            enc = self._detect_encoding(csv_file_path) if size else self.encoding[0]
+            occurrences = Counter()
+            rows = 0
+
+        with open(csv_file_path, "rb") as binary:
+            binary.seek(offset)
+            file = io.TextIOWrapper(binary, encoding=enc, newline="")
+            reader = csv.reader(file)
+            if not offset:
+                for _ in range(self.skip_rows):
                     next(reader, None)
-                    data = list(reader)
-                    if data and data[-1][0] == "":
-                        data.pop()
-                    processed_data = []
-                    for row in data:
-                        processed_row = self._process_row(row)
-                        if processed_row:
-                            processed_data.append(processed_row)
-                    self._rename_file_to_processed(csv_file_path)
-                    return processed_data
-            except UnicodeDecodeError:
-                logger.error(
-                    f"Unable to read file {csv_file_path} with encoding: {enc}"
-                )
-                continue  # 既定のutf-8での読み込みに失敗した場合、shift_jisで再度読み込む。
-        raise ValueError(
-            f"Unable to read file {csv_file_path} with encoding: {self.encoding}, utf-8, and shift_jis"
+            batch = []
+            # 末尾の空行（先頭列が空の行）を除外するため、1行先読みしてから処理する
+            pending = next(reader, None)
+            for row in reader:
+                rows += 1
+                processed_row = self._process_row(pending)
+                if processed_row:
+                    batch.append(self._with_fingerprint(processed_row, occurrences))
+                    if len(batch) >= VALIDATION_BATCH_SIZE:
+                        yield from validate_records(batch)
+                        batch = []
+                pending = row
+            if pending:
+                rows += 1
+            if pending and pending[0] != "":
+                processed_row = self._process_row(pending)
+                if processed_row:
+                    batch.append(self._with_fingerprint(processed_row, occurrences))
+            yield from validate_records(batch)
+
+        checkpoint.update(
+            offset=size,
+            digest=digest,
+            rows=rows,
+            encoding=enc,
+            occurrences=dict(occurrences),
+        )
+
+    def _resume_offset(self, csv_file_path: Path, entry: Optional[dict]):
+        """再開できるバイト位置と、ファイル全体のSHA-256を返す
+
+        前回の offset までの内容が変わっておらず、改行で終わっている場合だけ再開する。
+        """
+        hasher = hashlib.sha256()
+        offset = 0
+        with open(csv_file_path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if entry and 0 < entry["offset"] <= size:
+                _update_digest(hasher, file, entry["offset"])
+                file.seek(entry["offset"] - 1)
+                if hasher.hexdigest() == entry["digest"] and file.read(1) == b"\n":
+                    offset = entry["offset"]
+                else:
+                    hasher = hashlib.sha256()
+                    file.seek(0)
+            _update_digest(hasher, file, size - offset if offset else size)
+        return offset, hasher.hexdigest()
+
+    def _finish_file(self, csv_file_path: Path, checkpoint: dict):
+        # マニフェストを更新してから処理済みにリネームする
+        self.manifest.update(self._manifest_key(csv_file_path), checkpoint)
+        self._rename_file_to_processed(csv_file_path)
+
+    def _manifest_key(self, csv_file_path: Path) -> str:
+        # リネームの前後で同じキーになるよう、".processed" を除いたファイル名を使う
+        name = csv_file_path.name.replace(".processed.csv", ".csv")
+        return (self.target_file_path / name).as_posix()
+
+    def _with_fingerprint(
+        self, transaction: TransactionRecord, occurrences: Counter
+    ) -> TransactionRecord:
+        # 同じ明細を再度取り込んだ場合や、期間が重なる明細でも同じ指紋になる
+        key = fingerprint_key(
+            transaction.source,
+            transaction.date,
+            transaction.amount,
+            transaction.content,
         )
+        transaction.fingerprint = make_fingerprint(key, occurrences[key])
+        occurrences[key] += 1
+        return transaction
+
+    def _detect_encoding(self, csv_file_path: Path) -> str:
+        # 同じディレクトリで前回判定した文字コードを最初に試す
+        directory = csv_file_path.parent
+        cached = self._encoding_cache.get(directory)
+        candidates = list(self.encoding)
+        if cached:
+            candidates = [cached] + [enc for enc in candidates if enc != cached]
+
+        # ファイルを mmap し、BOM と先頭・末尾のサンプルから判定する（全体は読み込まない）
+        with open(csv_file_path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return candidates[0]
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                try:
+                    enc = detect_encoding(buffer, candidates)
+                except UnicodeError:
+                    raise ValueError(
+                        f"Unable to read file {csv_file_path} with encoding: {self.encoding}, utf-8, and shift_jis"
+                    )
+        self._encoding_cache[directory] = enc
+        return enc
 
     @abstractmethod
-    def _process_row(self, row) -> Transaction:
+    def _process_row(self, row) -> Optional[TransactionRecord]:
         pass
 
     def _rename_file_to_processed(self, csv_file_path: Path):
         if not csv_file_path.name.endswith(".processed.csv"):
             processed_file_name = f"{csv_file_path.stem}.processed.csv"
             processed_file_path = csv_file_path.parent / processed_file_name
-            csv_file_path.rename(processed_file_path)
+            try:
+                # 同名の処理済みファイルがあれば置き換える（OSに依らず同じ動作にする）
+                os.replace(csv_file_path, processed_file_path)
+            except FileNotFoundError:
+                logger.info(f"既にリネーム済みのためスキップしました: {csv_file_path}")
 
 
-# 各銀行やクレジットカード会社ごとのサブクラス
-class JapanPost(CsvFile):
-    """ゆうちょ銀行の明細用クラス"""
+class StatementCsvFile(CsvFile):
+    """明細の形式（formats.StatementFormat）の定義から解析するデータソース"""
 
-    def __init__(self):
-        super().__init__(target_file_path="bank/japan_post")
+    def __init__(self, statement_format: StatementFormat):
+        super().__init__(
+            encoding=list(statement_format.encoding),
+            target_file_path=statement_format.path,
+        )
+        self.statement_format = statement_format
+        self.name = statement_format.name
+        self.glob = statement_format.glob
+        self.skip_rows = statement_format.skip_rows
+        self._parser = compile_parser(statement_format, self.categorizer.categorize)
 
-    def _process_row(self, row):
-        transaction_date = datetime.strptime(row[0], "%Y%m%d").date().isoformat()
-        if row[5] in [
-            RAKUTEN_CARD,
-            MITSUI_SUMITOMO_CARD,
-        ]:  # クレジットカードの引き落としは除外
-            return None
-
-        if row[2]:
-            if row[5] == COMPANY:
-                t_type = "income"
-                amount = row[2]
-                category = "給与"
-                payee = row[4]
-            else:
-                t_type = "income"
-                amount = row[2]
-                category = "お小遣い"
-                payee = row[5] or row[4]
-        else:
-            if row[4] == "カード":  # カード引き出し
-                t_type = "expense"
-                amount = row[3]
-                category = "その他"
-                payee = "現金引き出し"
-            else:
-                t_type = "expense"
-                amount = row[3]
-                category = "その他"
-                payee = row[5] or row[4]
-        return Transaction(
-            date=transaction_date,
-            amount=amount,
-            content=convert_string(payee),
-            type=t_type,
-            category=category,
-            source="japan_post",
-            transaction_type="bank",
+    def __getstate__(self):
+        # 作った関数は pickle できないため、ワーカープロセスでは作り直す
+        state = self.__dict__.copy()
+        del state["_parser"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._parser = compile_parser(
+            self.statement_format, self.categorizer.categorize
         )
 
+    def _process_row(self, row):
+        return self._parser(row)
+
+
+def load_sources(formats: Optional[Dict[str, StatementFormat]] = None) -> List[CsvFile]:
+    """レジストリの全形式のデータソースを返す"""
+    formats = load_formats() if formats is None else formats
+    return [StatementCsvFile(statement_format) for statement_format in formats.values()]
 
-class Rakuten(CsvFile):
-    """楽天クレジットカードの明細用クラス"""
+
+# 各銀行やクレジットカード会社ごとのサブクラス（形式は formats.py で定義する）
+class JapanPost(StatementCsvFile):
+    """ゆうちょ銀行の明細用クラス"""
 
     def __init__(self):
-        super().__init__(target_file_path="credit_card/rakuten")
+        super().__init__(load_formats()["japan_post"])
 
-    def _process_row(self, row):
-        try:
-            transaction_date = datetime.strptime(row[0], "%Y/%m/%d").date().isoformat()
-        except ValueError:
-            logger.info(f"Skipping row due to invalid date: {row}")
-            return None
-
-        payee = row[1]
-        amount = int(row[6])
-
-        return Transaction(
-            date=transaction_date,
-            amount=amount,
-            content=convert_string(payee),
-            type="expense",
-            category="その他",
-            source="rakuten",
-            transaction_type="credit_card",
-        )
 
+class Rakuten(StatementCsvFile):
+    """楽天クレジットカードの明細用クラス"""
+
+    def __init__(self):
+        super().__init__(load_formats()["rakuten"])
 
-class MitsuiSumitomo(CsvFile):
+
+class MitsuiSumitomo(StatementCsvFile):
     """三井住友クレジットカードの明細用クラス"""
 
     def __init__(self):
-        super().__init__(
-            encoding=["shift_jis", "utf-8"],
-            target_file_path="credit_card/mitsui_sumitomo",
-        )
-
-    def _process_row(self, row):
-        if not row[0]:
-            logger.info(f"空の日付フィールドがある行をスキップしました: {row}")
-            return None
-        try:
-            transaction_date = datetime.strptime(row[0], "%Y/%m/%d").date().isoformat()
-        except ValueError:
-            logger.info(f"無効な日付形式の行をスキップしました: {row}")
-            return None
-
-        payee = row[1].replace("\u3000", " ")
-        if payee == "キャッシュバック（ポイント交換）":
-            return None
-
-        amount = int(row[2])
-
-        return Transaction(
-            date=transaction_date,
-            amount=amount,
-            content=convert_string(payee),
-            type="expense",
-            category="その他",
-            source="mitsui_sumitomo",
-            transaction_type="credit_card",
-        )
+        super().__init__(load_formats()["mitsui_sumitomo"])
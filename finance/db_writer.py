@@ -0,0 +1,55 @@
+import os
+import time
+from typing import Iterable
+
+from csv_file import BACKEND_APP_DIR
+from records import TransactionRecord
+from utils import setup_logger
+
+logger = setup_logger()
+
+# 既定では backend/app から起動したAPIと同じ SQLite のファイルに書き込む
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BACKEND_APP_DIR / 'finance.db'}")
+
+# backend の設定・モデルを使う（SQLAlchemy など backend の依存関係が必要）
+from core.database import SessionLocal  # noqa: E402
+from services.bulk_load import load_transactions  # noqa: E402
+
+
+class DatabaseWriter:
+    """取引をAPIを通さずにデータベースへ直接書き込むクラス
+
+    post() ごとに1つのDBトランザクションで登録する（PostgreSQL は COPY、SQLite は executemany）。
+    検証と指紋による重複のスキップは一括登録APIと同じ。
+    """
+
+    def __init__(self):
+        self.posted = 0
+        self.failed = 0
+        self.skipped = 0  # 登録済み（指紋が一致）のためスキップした件数
+        self.elapsed = 0.0
+
+    def post(self, transactions: Iterable[TransactionRecord]):
+        """取引を登録する（イテレータも受け付ける）。失敗した場合は何も登録せずに例外を送出する"""
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            posted, skipped, errors = load_transactions(
+                db, (transaction.dict() for transaction in transactions)
+            )
+        finally:
+            db.close()
+        for position, detail in errors:
+            logger.warning(f"Rejected: transaction {position} ({detail})")
+        self.posted += posted
+        self.skipped += skipped
+        self.failed += len(errors)
+        self.elapsed += time.perf_counter() - started
+
+    def report(self):
+        """登録件数・スキップ件数・失敗件数・スループットをログに出力する"""
+        rate = self.posted / self.elapsed if self.elapsed else 0
+        logger.info(
+            f"Wrote {self.posted} transactions, {self.skipped} skipped, "
+            f"{self.failed} failed in {self.elapsed:.1f}s ({rate:.0f} rows/s)"
+        )
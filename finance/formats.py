@@ -0,0 +1,329 @@
+"""
+明細CSVの形式（銀行・カード会社ごとの列の対応）を宣言的に定義するレジストリ。
+
+組み込みの形式（BUILTIN_FORMATS）に加え、JSONファイル（FINANCE_FORMATS_PATH、既定は
+finance/formats.json）に書いた形式を読み込む。同じ name の形式はJSONの方で上書きする。
+
+    {
+        "name": "example_bank",
+        "path": "bank/example_bank",
+        "transaction_type": "bank",
+        "encoding": ["shift_jis", "utf-8"],
+        "header": "^日付,入金,出金,摘要",
+        "date_format": "%Y/%m/%d",
+        "income_column": 1,
+        "expense_column": 2,
+        "payee_columns": [3],
+        "exclude": [{"column": 3, "values": ["ラクテンカード"]}]
+    }
+
+- name: データソース名（取引の source になる）
+- path: csv_files 以下のディレクトリ、glob: 対象のファイル名のパターン（既定は *.csv）
+- encoding: 試す文字コードの順、skip_rows: 先頭の読み飛ばす行数（既定は1）
+- header: 1行目に一致する正規表現（受け取りディレクトリのファイルの振り分けに使う）
+- date_column・date_format: 日付の列と形式、skip_invalid_dates: 不正な日付の行を飛ばすか
+- 金額: income_column・expense_column（収入の列が空でなければ収入）、または
+  amount_column（符号付き。正の値を positive の収支タイプとし、負の値は反対のタイプにする）
+- payee_columns: 内容の列（空でない最初の列を使う）
+- exclude: 列の値が values のいずれかに一致する行を除外する
+- overrides: 条件（when）に一致した行のカテゴリ・内容を固定する（type で収支タイプを限定できる）
+- default_category: ルールエンジンで分類できなかったときのカテゴリ
+
+列の番号は0始まり。読み込み時に形式を検証し、行の解析には compile_parser で作った関数を使う。
+"""
+
+import codecs
+import json
+import os
+import re
+from pathlib import Path
+from typing import Callable, Dict, List, Literal, Optional
+
+from category import COMPANY, MITSUI_SUMITOMO_CARD, RAKUTEN_CARD
+from pydantic import BaseModel
+from records import Category, TransactionRecord
+from utils import convert_string, parse_date, setup_logger
+
+logger = setup_logger()
+
+FORMATS_PATH = os.environ.get(
+    "FINANCE_FORMATS_PATH", str(Path(__file__).parent / "formats.json")
+)
+
+# 形式を判定するときに読む先頭のバイト数
+SNIFF_SIZE = 4096
+
+
+class Condition(BaseModel):
+    column: int
+    values: List[str]
+
+
+class Override(BaseModel):
+    when: Condition
+    type: Optional[Literal["income", "expense"]] = None
+    category: Optional[Category] = None
+    payee_columns: Optional[List[int]] = None
+    content: Optional[str] = None  # 固定の内容（payee_columns より優先）
+
+
+class StatementFormat(BaseModel):
+    name: str
+    path: str
+    transaction_type: Literal["bank", "credit_card"]
+    glob: str = "*.csv"
+    encoding: List[str] = ["utf-8", "shift_jis"]
+    skip_rows: int = 1
+    header: Optional[str] = None
+    date_column: int = 0
+    date_format: str
+    skip_invalid_dates: bool = False
+    income_column: Optional[int] = None
+    expense_column: Optional[int] = None
+    amount_column: Optional[int] = None
+    positive: Literal["income", "expense"] = "expense"
+    payee_columns: List[int]
+    exclude: List[Condition] = []
+    overrides: List[Override] = []
+    default_category: Dict[Literal["income", "expense"], Category] = {
+        "income": "お小遣い",
+        "expense": "その他",
+    }
+
+
+# 組み込みの形式（category.py の定数を使うものはここで定義する）
+BUILTIN_FORMATS = [
+    {
+        "name": "japan_post",
+        "path": "bank/japan_post",
+        "transaction_type": "bank",
+        "header": "^取引日,",
+        "date_format": "%Y%m%d",
+        "income_column": 2,
+        "expense_column": 3,
+        "payee_columns": [5, 4],
+        # クレジットカードの引き落としは除外
+        "exclude": [{"column": 5, "values": [RAKUTEN_CARD, MITSUI_SUMITOMO_CARD]}],
+        "overrides": [
+            {
+                "when": {"column": 5, "values": [COMPANY]},
+                "type": "income",
+                "category": "給与",
+                "payee_columns": [4],
+            },
+            {
+                "when": {"column": 4, "values": ["カード"]},  # カード引き出し
+                "type": "expense",
+                "category": "その他",
+                "content": "現金引き出し",
+            },
+        ],
+    },
+    {
+        "name": "rakuten",
+        "path": "credit_card/rakuten",
+        "transaction_type": "credit_card",
+        "header": '^"?利用日"?,"?利用店名・商品名"?,',
+        "date_format": "%Y/%m/%d",
+        "skip_invalid_dates": True,
+        "expense_column": 6,
+        "payee_columns": [1],
+    },
+    {
+        "name": "mitsui_sumitomo",
+        "path": "credit_card/mitsui_sumitomo",
+        "transaction_type": "credit_card",
+        "encoding": ["shift_jis", "utf-8"],
+        # 1行目は氏名・カード番号（マスク済み）・カード名
+        "header": r"様,[0-9*]{4}-[0-9*]{4}-",
+        "date_format": "%Y/%m/%d",
+        "skip_invalid_dates": True,
+        "expense_column": 2,
+        "payee_columns": [1],
+        "exclude": [{"column": 1, "values": ["キャッシュバック（ポイント交換）"]}],
+    },
+]
+
+
+def load_formats(path=FORMATS_PATH) -> Dict[str, StatementFormat]:
+    """組み込みの形式とJSONファイルの形式を name ごとに返す（不正な形式は ValueError）"""
+    specs = list(BUILTIN_FORMATS)
+    try:
+        with open(path, encoding="utf-8") as file:
+            specs += json.load(file)
+    except FileNotFoundError:
+        pass
+
+    formats = {}
+    for index, spec in enumerate(specs):
+        try:
+            statement_format = StatementFormat(**spec)
+        except ValueError as e:
+            raise ValueError(f"Invalid statement format {index}: {e}")
+        _check_columns(statement_format)
+        formats[statement_format.name] = statement_format
+    return formats
+
+
+def _check_columns(statement_format: StatementFormat):
+    has_split = (
+        statement_format.income_column is not None
+        or statement_format.expense_column is not None
+    )
+    if has_split == (statement_format.amount_column is not None):
+        raise ValueError(
+            f"Statement format {statement_format.name} needs either "
+            "income_column/expense_column or amount_column"
+        )
+    if has_split and statement_format.expense_column is None:
+        raise ValueError(
+            f"Statement format {statement_format.name} needs expense_column"
+        )
+    if statement_format.header is not None:
+        re.compile(statement_format.header)
+
+
+def compile_parser(
+    statement_format: StatementFormat, categorize: Callable[[str, str], Optional[str]]
+) -> Callable[[list], Optional[TransactionRecord]]:
+    """形式から、CSVの1行を TransactionRecord に変換する関数を作る（除外する行は None）
+
+    列の番号や条件は事前にローカル変数・集合にしておき、1行ごとの処理を最小限にする。
+    categorize は (内容, 収支タイプ) からカテゴリを返す関数（分類できなければ None）。
+    """
+    name = statement_format.name
+    transaction_type = statement_format.transaction_type
+    date_column = statement_format.date_column
+    date_format = statement_format.date_format
+    skip_invalid_dates = statement_format.skip_invalid_dates
+    signed = statement_format.amount_column is not None
+    amount_column = statement_format.amount_column
+    income_column = statement_format.income_column
+    expense_column = statement_format.expense_column
+    positive = statement_format.positive
+    negative = "income" if positive == "expense" else "expense"
+    payee_columns = tuple(statement_format.payee_columns)
+    exclusions = [
+        (condition.column, frozenset(condition.values))
+        for condition in statement_format.exclude
+    ]
+    overrides = [
+        (
+            override.type,
+            override.when.column,
+            frozenset(override.when.values),
+            override.category,
+            tuple(override.payee_columns or payee_columns),
+            override.content,
+        )
+        for override in statement_format.overrides
+    ]
+    default_category = statement_format.default_category
+
+    def parse(row):
+        try:
+            transaction_date = parse_date(row[date_column], date_format)
+        except ValueError:
+            if not skip_invalid_dates:
+                raise
+            logger.info(f"無効な日付の行をスキップしました: {row}")
+            return None
+        for column, values in exclusions:
+            if row[column] in values:
+                return None
+
+        if signed:
+            value = row[amount_column]
+        elif income_column is not None and row[income_column]:
+            t_type, value = "income", row[income_column]
+        else:
+            t_type, value = "expense", row[expense_column]
+        # 桁区切りのカンマを許容する
+        amount = int(value.replace(",", "") if "," in value else value)
+        if signed:
+            t_type = positive if amount >= 0 else negative
+            amount = abs(amount)
+
+        category = None
+        columns = payee_columns
+        payee = ""
+        for o_type, column, values, o_category, o_columns, o_content in overrides:
+            if (o_type is None or o_type == t_type) and row[column] in values:
+                category = o_category
+                columns = () if o_content is not None else o_columns
+                payee = o_content or ""
+                break
+        # 空でない最初の列を内容にする
+        for column in columns:
+            if row[column]:
+                payee = row[column]
+                break
+
+        content = convert_string(payee)
+        if category is None:
+            category = categorize(content, t_type) or default_category.get(t_type)
+        return TransactionRecord(
+            date=transaction_date,
+            amount=amount,
+            content=content,
+            type=t_type,
+            category=category,
+            source=name,
+            transaction_type=transaction_type,
+        )
+
+    return parse
+
+
+def _read_first_line(csv_file_path: Path, encodings: List[str]) -> Optional[str]:
+    # 1行目を復号できた最初の文字コードで返す（どれでも復号できなければ None）
+    with open(csv_file_path, "rb") as file:
+        head = file.read(SNIFF_SIZE)
+    if len(head) == SNIFF_SIZE:
+        # 末尾は文字の途中で切れている可能性があるため、最後の改行までを使う
+        head = head[: head.rfind(b"\n") + 1]
+    if head.startswith(codecs.BOM_UTF8):
+        encodings = ["utf-8-sig"]
+    for encoding in encodings:
+        try:
+            text = head.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+        return text.split("\n", 1)[0].rstrip("\r")
+    return None
+
+
+def sniff_format(
+    csv_file_path: Path, formats: Dict[str, StatementFormat]
+) -> Optional[StatementFormat]:
+    """1行目が header に一致する最初の形式を返す（一致しなければ None）"""
+    for statement_format in formats.values():
+        if statement_format.header is None:
+            continue
+        line = _read_first_line(csv_file_path, statement_format.encoding)
+        if line is not None and re.search(statement_format.header, line):
+            return statement_format
+    return None
+
+
+def route_files(
+    inbox: Path, base_path: Path, formats: Dict[str, StatementFormat]
+) -> List[Path]:
+    """受け取りディレクトリのCSVを、1行目から判定した形式のディレクトリへ移動する
+
+    移動したファイルのパスを返す。判定できなかったファイルはそのまま残す。
+    """
+    routed = []
+    for csv_file_path in sorted(Path(inbox).glob("*.csv")):
+        statement_format = sniff_format(csv_file_path, formats)
+        if statement_format is None:
+            logger.warning(f"明細の形式を判定できませんでした: {csv_file_path.name}")
+            continue
+        target_path = Path(base_path) / statement_format.path
+        target_path.mkdir(parents=True, exist_ok=True)
+        # 同じ名前のファイル（再ダウンロード分）は新しい方で置き換える
+        destination = target_path / csv_file_path.name
+        os.replace(csv_file_path, destination)
+        logger.info(f"{csv_file_path.name} を {statement_format.name} に振り分けました")
+        routed.append(destination)
+    return routed
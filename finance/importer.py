@@ -0,0 +1,85 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from csv_file import CsvFile
+from records import TransactionRecord
+from utils import setup_logger
+
+logger = setup_logger()
+
+
+def default_workers() -> int:
+    # 環境変数 FINANCE_IMPORT_WORKERS で上書きできる（既定はCPUコア数）
+    return int(os.environ.get("FINANCE_IMPORT_WORKERS", os.cpu_count() or 1))
+
+
+def _parse_file(task: Tuple[CsvFile, Path]) -> Tuple[List[TransactionRecord], dict]:
+    # ワーカープロセスで1ファイルを解析する。マニフェストの更新とリネームは親プロセスでのみ行う
+    source, csv_file_path = task
+    checkpoint = {}
+    transactions = list(source._iter_new_rows(csv_file_path, checkpoint))
+    return transactions, checkpoint
+
+
+def _collect_tasks(sources: Sequence[CsvFile]) -> List[Tuple[CsvFile, Path]]:
+    tasks = []
+    seen = set()
+    for source in sources:
+        target_path = Path(source.base_path) / source.target_file_path
+        for csv_file in source._get_csv_files(target_path):
+            csv_file_path = (target_path / csv_file).resolve()
+            # 同じファイルを2つのワーカーが処理しないようにする
+            if csv_file_path in seen:
+                continue
+            seen.add(csv_file_path)
+            tasks.append((source, csv_file_path))
+    return tasks
+
+
+def iter_parsed_files(
+    sources: Sequence[CsvFile], workers: Optional[int] = None
+) -> Iterator[Tuple[CsvFile, Path, List[TransactionRecord], dict]]:
+    """全データソースのCSVをプロセスプールで並列に解析し、ファイルごとの結果を返す。
+
+    結果は sources の順、各ソース内ではファイル名順に返す（完了順には依存しない）。
+    マニフェストへの記録とリネームは行わない。呼び出し側がそのファイルの取引を登録できた後に
+    finish_file にチェックポイントを渡して処理済みにする（失敗したファイルは次回また読み込む）。
+    workers=1 の場合はプロセスを起動せずに順番に処理する。
+    """
+    tasks = _collect_tasks(sources)
+    workers = max(1, min(workers or default_workers(), len(tasks) or 1))
+
+    if workers == 1:
+        results = map(_parse_file, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(_parse_file, tasks)
+
+    try:
+        for (source, csv_file_path), (transactions, checkpoint) in zip(tasks, results):
+            logger.info(f"{csv_file_path.name}: {len(transactions)} 件を解析しました")
+            yield source, csv_file_path, transactions, checkpoint
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def finish_file(source: CsvFile, csv_file_path: Path, checkpoint: dict):
+    """ファイルをマニフェストに記録して処理済みにリネームする（親プロセスでのみ呼ぶ）"""
+    source._finish_file(csv_file_path, checkpoint)
+
+
+def import_sources(
+    sources: Sequence[CsvFile], workers: Optional[int] = None
+) -> Dict[str, List[TransactionRecord]]:
+    """全データソースを並列に解析し、ソース名ごとに結果をまとめて返す"""
+    merged = {source.name: [] for source in sources}
+    for source, csv_file_path, transactions, checkpoint in iter_parsed_files(
+        sources, workers
+    ):
+        merged[source.name].extend(transactions)
+        finish_file(source, csv_file_path, checkpoint)
+    return merged
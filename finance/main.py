@@ -1,14 +1,59 @@
-from csv_file import JapanPost, MitsuiSumitomo, Rakuten
+import argparse
+
+from csv_file import CSV_FILES_DIR, INBOX_DIR_NAME, load_sources
+from formats import load_formats, route_files
+from importer import default_workers, finish_file, iter_parsed_files
 from uploader import FinanceUploader
+from utils import setup_logger
+
+logger = setup_logger()
+
+# 1回のアップロードで送る取引の件数
+UPLOAD_BATCH_SIZE = 500
 
 if __name__ == "__main__":
-    rakuten = Rakuten()
-    japan_post = JapanPost()
-    mitsui_sumitomo = MitsuiSumitomo()
-    uploader = FinanceUploader("http://localhost:8000/api")
-    jp_transactions = japan_post.process_files()
-    rakuten_transactions = rakuten.process_files()
-    ms_transactions = mitsui_sumitomo.process_files()
-
-    for transactions in jp_transactions + rakuten_transactions + ms_transactions:
-        uploader.post(transactions)
+    parser = argparse.ArgumentParser(description="CSVの明細を解析してアップロードする")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=default_workers(),
+        help="CSVを解析するプロセス数（1の場合は並列化しない）",
+    )
+    parser.add_argument(
+        "--direct",
+        action="store_true",
+        help="APIを通さずにデータベースへ直接書き込む（DATABASE_URL、backend の依存関係が必要）",
+    )
+    args = parser.parse_args()
+
+    # 受け取りディレクトリのCSVを1行目から形式を判定して振り分け、全形式の明細を取り込む
+    formats = load_formats()
+    route_files(CSV_FILES_DIR / INBOX_DIR_NAME, CSV_FILES_DIR, formats)
+    sources = load_sources(formats)
+    parsed_files = iter_parsed_files(sources, workers=args.workers)
+
+    if args.direct:
+        from db_writer import DatabaseWriter
+
+        # ファイルごとに1つのDBトランザクションで登録する
+        writer = DatabaseWriter()
+    else:
+        # ファイルごとに一定件数ずつアップロードする（解析は並列に先行して進む）
+        writer = FinanceUploader(
+            "http://localhost:8000/api", batch_size=UPLOAD_BATCH_SIZE
+        )
+
+    # 全件を登録できたファイルだけをマニフェストに記録して処理済みにリネームする
+    # 失敗した行があるファイル（登録時に例外が起きたファイルも）は次回また読み込む
+    # （登録済みの行は指紋でスキップされる）
+    for source, csv_file_path, file_transactions, checkpoint in parsed_files:
+        failed = writer.failed
+        writer.post(file_transactions)
+        if writer.failed == failed:
+            finish_file(source, csv_file_path, checkpoint)
+        else:
+            logger.warning(
+                f"{csv_file_path.name}: {writer.failed - failed} 件を登録できなかったため、"
+                "処理済みにしません"
+            )
+    writer.report()
@@ -0,0 +1,47 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+
+class ImportManifest:
+    """取り込み済みのCSVを記録するJSONファイル
+
+    ファイルごとに、処理済みのバイト数（offset）・その範囲のSHA-256（digest）・行数（rows）・
+    文字コード（encoding）・指紋の出現回数（occurrences）を保存する。
+    追記されただけのファイルは、次回 offset 以降だけを解析できる。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._entries = None
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def get(self, key: str) -> Optional[dict]:
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries.get(key)
+
+    def update(self, key: str, entry: dict):
+        # 他のデータソースの更新を消さないよう、保存の直前に読み直す
+        entries = self._load()
+        entries[key] = entry
+        # 一時ファイルに書いてから置き換え、途中で止まっても壊れたファイルを残さない
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(entries, file, ensure_ascii=False)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._entries = entries
@@ -0,0 +1,107 @@
+from typing import List, Literal, Optional, Union, get_args, get_type_hints
+
+from pydantic import BaseModel
+
+Category = Union[
+    Literal["食費", "日用品", "住居費", "交際費", "娯楽", "交通費", "その他"],
+    Literal["給与", "副収入", "お小遣い"],
+]
+
+
+class Transaction(BaseModel):
+    date: str
+    amount: int
+    content: str
+    type: Literal["income", "expense"]
+    category: Category
+    # データソース（NULLを許可）。明細の形式（formats.py）の name で、JSONで追加できる
+    source: Optional[str] = None
+    transaction_type: Optional[Literal["bank", "credit_card"]] = (
+        None  # 取引タイプ（NULLを許可）
+    )
+    fingerprint: Optional[str] = None  # 重複取り込みを防ぐための指紋
+
+
+class TransactionRecord:
+    """解析中の取引を表す軽量なレコード（Transaction と同じ項目を持つ）
+
+    行ごとに Pydantic のモデルを作らず、validate_records でまとめて検証する。
+    """
+
+    __slots__ = (
+        "date",
+        "amount",
+        "content",
+        "type",
+        "category",
+        "source",
+        "transaction_type",
+        "fingerprint",
+    )
+
+    def __init__(
+        self,
+        date: str,
+        amount: int,
+        content: str,
+        type: str,
+        category: str,
+        source: Optional[str] = None,
+        transaction_type: Optional[str] = None,
+        fingerprint: Optional[str] = None,
+    ):
+        self.date = date
+        self.amount = amount
+        self.content = content
+        self.type = type
+        self.category = category
+        self.source = source
+        self.transaction_type = transaction_type
+        self.fingerprint = fingerprint
+
+    def dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        return isinstance(other, TransactionRecord) and self.dict() == other.dict()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"TransactionRecord({fields})"
+
+
+def _literal_values(annotation) -> set:
+    # Literal・Union・Optional の注釈から、許可される値をすべて取り出す
+    if annotation is type(None):
+        return {None}
+    if getattr(annotation, "__origin__", None) is Literal:
+        return set(get_args(annotation))
+    values = set()
+    for arg in get_args(annotation):
+        values |= _literal_values(arg)
+    return values
+
+
+# Transaction の Literal の項目ごとに、許可される値（検証の基準は Transaction のまま）
+ALLOWED_VALUES = {
+    name: values
+    for name, values in (
+        (name, _literal_values(annotation))
+        for name, annotation in get_type_hints(Transaction).items()
+    )
+    if values - {None}
+}
+
+
+def validate_records(records: List[TransactionRecord]) -> List[TransactionRecord]:
+    """レコードをまとめて検証する（不正な値があれば ValueError）"""
+    allowed = list(ALLOWED_VALUES.items())
+    for index, record in enumerate(records):
+        if type(record.amount) is not int:
+            raise ValueError(f"Invalid amount in record {index}: {record!r}")
+        if type(record.date) is not str or type(record.content) is not str:
+            raise ValueError(f"Invalid date or content in record {index}: {record!r}")
+        for name, values in allowed:
+            if getattr(record, name) not in values:
+                raise ValueError(f"Invalid {name} in record {index}: {record!r}")
+    return records
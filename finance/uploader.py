@@ -1,19 +1,105 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, List
+
 import requests
+from records import Transaction
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils import batched, setup_logger
+
+logger = setup_logger()
 
 
 class FinanceUploader:
-    def __init__(self, api_url: str):
+    """取引を一括登録APIへまとめて送るクラス
+
+    接続はセッションで使い回し、バッチを max_workers 件まで並行に送信する。
+    5xx エラーと接続エラーは指数バックオフで max_retries 回まで再送する。
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        batch_size: int = 500,
+        max_workers: int = 4,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeout: float = 30,
+    ):
         self.api_url = api_url
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[500, 502, 503, 504],
+            allowed_methods=frozenset(["POST"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=max_workers, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.posted = 0
+        self.failed = 0
+        self.skipped = 0  # 登録済み（指紋が一致）のためAPIがスキップした件数
+        self.elapsed = 0.0
+
+    def post(self, transactions: Iterable[Transaction]):
+        """取引をバッチに分けて送信する（イテレータも受け付ける）"""
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = set()
+            for batch in batched(transactions, self.batch_size):
+                # 未完了のバッチが溜まりすぎないよう、空きができるまで待つ
+                if len(pending) >= self.max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._collect(done)
+                pending.add(executor.submit(self._post_batch, batch))
+            self._collect(wait(pending).done)
+        self.elapsed += time.perf_counter() - started
+
+    def _collect(self, futures):
+        for future in futures:
+            posted, failed, skipped = future.result()
+            self.posted += posted
+            self.failed += failed
+            self.skipped += skipped
+
+    def _post_batch(self, batch: List[Transaction]):
+        url = f"{self.api_url}/transactions/bulk"
+        try:
+            response = self.session.post(
+                url,
+                json=[transaction.dict() for transaction in batch],
+                timeout=self.timeout,
+            )
+        except requests.RequestException as e:
+            logger.error(f"Failed to post {len(batch)} transactions: {e}")
+            return 0, len(batch), 0
+
+        if response.status_code != 200:
+            logger.error(
+                f"Failed to post {len(batch)} transactions. "
+                f"Status code: {response.status_code}"
+            )
+            return 0, len(batch), 0
+
+        result = response.json()
+        for error in result["errors"]:
+            logger.warning(f"Rejected: {batch[error['index']]} ({error['detail']})")
+        return len(result["ids"]), len(result["errors"]), result.get("skipped", 0)
 
-    def post(self, transactions):
-        url = f"{self.api_url}/transactions"  # 実際のAPIエンドポイントを指定
-        headers = {"Content-Type": "application/json"}
-        transactions_dict = [transaction.dict() for transaction in transactions]
-
-        for transaction in transactions_dict:
-            print(transaction)
-            response = requests.post(url, json=transaction, headers=headers)
-            if response.status_code == 200:
-                print("Data posted successfully")
-            else:
-                print(f"Failed to post data. Status code: {response.status_code}")
+    def report(self):
+        """送信件数・スキップ件数・失敗件数・スループットをログに出力する"""
+        rate = self.posted / self.elapsed if self.elapsed else 0
+        logger.info(
+            f"Uploaded {self.posted} transactions, {self.skipped} skipped, "
+            f"{self.failed} failed in {self.elapsed:.1f}s ({rate:.0f} rows/s)"
+        )
@@ -1,17 +1,30 @@
+import codecs
+import hashlib
 import logging
 import unicodedata
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, List
 
 
 def setup_logger():
     logger = logging.getLogger("FinanceLogger")
-    handler = logging.StreamHandler()
-    formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    # 複数のモジュールから呼ばれてもログが重複しないよう、ハンドラは1つだけ追加する
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
     logger.setLevel(logging.INFO)
     return logger
 
 
+# 変換結果をメモする件数の上限（同じ支払先・日付が繰り返し現れるため）
+CONVERT_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=CONVERT_CACHE_SIZE)
 def convert_string(input_str: str) -> str:
     # 半角のハイフンを全角の伸ばし棒に置換
     input_str = input_str.replace("-", "ｰ")
@@ -20,3 +33,103 @@ def convert_string(input_str: str) -> str:
     fullwidth_str = unicodedata.normalize("NFKC", input_str)
 
     return fullwidth_str
+
+
+def _split_date(value: str, format: str):
+    # 明細で使われる形式の場合だけ、年・月・日の文字列に分ける（それ以外は None）
+    if not value.isascii():
+        return None
+    if format == "%Y%m%d" and len(value) == 8:
+        parts = value[:4], value[4:6], value[6:]
+    elif format == "%Y/%m/%d" and len(value) == 10 and value[4] == value[7] == "/":
+        parts = value[:4], value[5:7], value[8:]
+    else:
+        return None
+    return parts if all(part.isdigit() for part in parts) else None
+
+
+@lru_cache(maxsize=CONVERT_CACHE_SIZE)
+def parse_date(value: str, format: str) -> str:
+    """日付の文字列を ISO 形式（YYYY-MM-DD）に変換する（不正な値は ValueError）
+
+    明細で使われる %Y%m%d と %Y/%m/%d は strptime を使わずに解析する。
+    """
+    parts = _split_date(value, format)
+    if parts is None:
+        return datetime.strptime(value, format).date().isoformat()
+    # 存在しない日付（2月30日など）は date が ValueError にする
+    year, month, day = parts
+    return date(int(year), int(month), int(day)).isoformat()
+
+
+def fingerprint_key(source: str, date: str, amount: int, content: str) -> str:
+    # 取引の内容から作る短いキー（ファイル内での出現回数を数えるのに使う）
+    key = "\x1f".join([source or "", date, str(amount), content])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def make_fingerprint(key: str, occurrence: int) -> str:
+    # 同じファイル内で同一内容の取引が複数ある場合は、出現順（occurrence）で区別する
+    return hashlib.sha256(f"{key}\x1f{occurrence}".encode("utf-8")).hexdigest()
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    # イテラブルを size 件ずつのリストに分割する（itertools.batched は Python 3.12 以降）
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+# 文字コード判定で確認する先頭・末尾のバイト数
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+
+def _decodes(data, encoding: str, final: bool = True) -> bool:
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(data, final=final)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _decodes_fully(buffer, encoding: str) -> bool:
+    # 文字列を保持せずに、バッファ全体をチャンクごとに復号できるか確認する
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        for start in range(0, len(buffer), ENCODING_SAMPLE_SIZE):
+            decoder.decode(buffer[start : start + ENCODING_SAMPLE_SIZE])
+        decoder.decode(b"", final=True)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def detect_encoding(buffer, candidates: List[str]) -> str:
+    """バイト列（mmap など）から文字コードを判定する。
+
+    BOM があれば utf-8-sig とし、なければ先頭と末尾のサンプルを候補の順に復号して判定する。
+    サンプルがASCIIのみで判別できない場合に限り、全体を復号できるか確認する。
+    """
+    if buffer[:3] == codecs.BOM_UTF8:
+        return "utf-8-sig"
+
+    size = len(buffer)
+    head = buffer[:ENCODING_SAMPLE_SIZE]
+    tail = b""
+    if size > ENCODING_SAMPLE_SIZE:
+        # 改行の直後から読むことで、マルチバイト文字の途中から復号しないようにする
+        tail_start = max(size - ENCODING_SAMPLE_SIZE, ENCODING_SAMPLE_SIZE)
+        newline = buffer.find(b"\n", tail_start)
+        if newline != -1:
+            tail = buffer[newline + 1 :]
+    conclusive = size <= ENCODING_SAMPLE_SIZE or not (head.isascii() and tail.isascii())
+
+    for encoding in candidates:
+        # 先頭のサンプルは末尾で文字が切れている可能性があるため final=False で復号する
+        if not _decodes(head, encoding, final=size <= ENCODING_SAMPLE_SIZE):
+            continue
+        if not _decodes(tail, encoding):
+            continue
+        if conclusive or _decodes_fully(buffer, encoding):
+            return encoding
+    raise UnicodeError(f"None of the encodings {candidates} can decode the data")
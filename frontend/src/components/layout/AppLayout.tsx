@@ -11,8 +11,9 @@ import SideBar from "../common/SideBar";
 import { useAppContext } from "@/context/AppContext";
 import { Transaction } from "@/types";
 import { isFireStoreError } from "@/utils/errorHandling";
-import { DefaultApi } from "@/client";
+import { DefaultApi, Transaction as ApiTransaction } from "@/client";
 import { config } from "@/utils/apiClient";
+import { endOfMonth, format, startOfMonth } from "date-fns";
 
 const drawerWidth = 240;
 
@@ -21,12 +22,26 @@ export default function AppLayout() {
   const [isClosing, setIsClosing] = React.useState(false);
   const apiInstance = new DefaultApi(config);
 
-  const { setTransactions, setIsLoading } = useAppContext();
+  const { setTransactions, setIsLoading, currentMonth } = useAppContext();
   React.useEffect(() => {
     const fetchTransactions = async () => {
       try {
-        const querySnapshot = await apiInstance.getTransactions();
-        const transactionsData = querySnapshot.data.map((doc) => {
+        // 表示中の月の取引だけをページ単位で取得する
+        const params = {
+          from: format(startOfMonth(currentMonth), "yyyy-MM-dd"),
+          to: format(endOfMonth(currentMonth), "yyyy-MM-dd"),
+          limit: 1000,
+        };
+        const docs: ApiTransaction[] = [];
+        let cursor: string | undefined = undefined;
+        do {
+          const querySnapshot = await apiInstance.getTransactions({
+            params: { ...params, cursor },
+          });
+          docs.push(...querySnapshot.data);
+          cursor = querySnapshot.headers["x-next-cursor"];
+        } while (cursor);
+        const transactionsData = docs.map((doc) => {
           return {
             id: String(doc.id), // 各トランザクションのIDを設定
             date: doc.date, // 各トランザクションの日付を設定
@@ -48,7 +63,7 @@ export default function AppLayout() {
       }
     };
     fetchTransactions();
-  }, []);
+  }, [currentMonth]);
 
   const handleDrawerClose = () => {
     setIsClosing(true);